@@ -1,13 +1,33 @@
+import asyncio
 import json
 import os
+import re
+from functools import lru_cache
 from dotenv import load_dotenv
 from livekit.plugins import google
 from livekit import agents, rtc
-from livekit.agents import AgentServer, AgentSession, Agent, room_io
+from livekit.agents import AgentServer, AgentSession, Agent, RunContext, function_tool, room_io
 from livekit.plugins import noise_cancellation
 
 load_dotenv(".env.local")
 
+# uvloop lowers scheduling overhead and callback latency on the audio path.
+# Installed at import time so job processes spawned by the worker pick it up too.
+try:
+    import uvloop
+
+    uvloop.install()
+except ImportError:
+    pass
+
+# Optionally pin the process to one CPU (e.g. NYAYA_AGENT_CPU=2) to reduce jitter
+_agent_cpu = os.environ.get("NYAYA_AGENT_CPU")
+if _agent_cpu and hasattr(os, "sched_setaffinity"):
+    try:
+        os.sched_setaffinity(0, {int(_agent_cpu)})
+    except (ValueError, OSError) as e:
+        print(f"[nyaya-agent] Could not pin to CPU {_agent_cpu}: {e}")
+
 SYSTEM_PROMPT = """You are Nyay AI, a voice-based Indian legal guidance assistant. You will be provided with a parsed text (Markdown) version of a legal document uploaded by the user. Your ONLY purpose is to help ordinary people understand the specific contract, legal notice, or agreement they just uploaded.
 
 1. LANGUAGE SELECTION & CONSISTENCY (CRITICAL)
@@ -66,35 +86,146 @@ End every turn with a clear, single question or a practical next step to keep th
 --- FLAGGED RISKS END ---
 """
 
+# Static part of the prompt, split off once so sessions only build the context tail
+_PROMPT_HEAD = SYSTEM_PROMPT[:SYSTEM_PROMPT.index("--- DOCUMENT START ---")]
+
+
+@lru_cache(maxsize=32)
+def build_system_prompt(document: str, risks: str) -> str:
+    """Build the full system prompt for a document and its flagged risks."""
+    return (
+        f"{_PROMPT_HEAD}--- DOCUMENT START ---\n"
+        f"{document or 'No document provided.'}\n"
+        f"--- DOCUMENT END ---\n\n"
+        f"--- FLAGGED RISKS ---\n"
+        f"{risks or 'No risks flagged.'}\n"
+        f"--- FLAGGED RISKS END ---\n"
+    )
+
+
+# Documents longer than this are trimmed to the preamble and risk-tagged clauses;
+# the remaining clauses are served on demand through the lookup_clause tool
+MAX_DOC_CHARS = int(os.environ.get("NYAYA_MAX_DOC_CHARS", "32000"))
+
+_CLAUSE_START = re.compile(r"^(?=\d+\. )", re.MULTILINE)
+_CLAUSE_NUMBER = re.compile(r"(\d+)\. ")
+
+
+def _risk_priority(section: str) -> int:
+    """Rank a section by its most severe risk tag (lower is kept first)."""
+    if "-hr-" in section:
+        return 0
+    if "-mr-" in section:
+        return 1
+    if "-lr-" in section:
+        return 2
+    return 3
+
+
+def compact_document(document: str) -> tuple[str, dict[str, str]]:
+    """
+    Fit the document into MAX_DOC_CHARS for the prompt.
+
+    Returns the in-prompt document and the full text of every numbered
+    clause, keyed by clause number.
+    """
+    sections = _CLAUSE_START.split(document)
+
+    clauses: dict[str, str] = {}
+    numbers: list[str | None] = []
+    for section in sections:
+        match = _CLAUSE_NUMBER.match(section)
+        number = match.group(1) if match else None
+        numbers.append(number)
+        if number:
+            existing = clauses.get(number)
+            clauses[number] = f"{existing}\n\n{section.strip()}" if existing else section.strip()
+
+    if len(document) <= MAX_DOC_CHARS:
+        return document, clauses
+
+    # Always keep the preamble, then fill the budget by risk severity
+    keep = {i for i, number in enumerate(numbers) if number is None}
+    budget = MAX_DOC_CHARS - sum(len(sections[i]) for i in keep)
+    candidates = sorted(
+        (i for i, number in enumerate(numbers) if number is not None),
+        key=lambda i: (_risk_priority(sections[i]), i),
+    )
+    for i in candidates:
+        if len(sections[i]) <= budget:
+            keep.add(i)
+            budget -= len(sections[i])
+
+    omitted = sorted(
+        {numbers[i] for i in range(len(sections)) if i not in keep},
+        key=int,
+    )
+    compacted = "".join(sections[i] for i in sorted(keep))[:MAX_DOC_CHARS].rstrip()
+    if omitted:
+        compacted += (
+            f"\n\n[Clauses omitted for length: {', '.join(omitted)}. "
+            "Use the lookup_clause tool to read any of them before answering about them.]"
+        )
+
+    return compacted, clauses
+
+
+class NyayaAgent(Agent):
+    """Voice agent with on-demand access to clauses left out of the prompt."""
+
+    def __init__(self, instructions: str, clauses: dict[str, str]) -> None:
+        super().__init__(instructions=instructions)
+        self._clauses = clauses
+
+    @function_tool()
+    async def lookup_clause(self, context: RunContext, clause_number: str) -> str:
+        """Get the full text of a numbered clause from the user's document.
+
+        Args:
+            clause_number: The clause number, for example "7"
+        """
+        number = clause_number.strip().rstrip(".")
+        return self._clauses.get(number, f"Clause {number} was not found in the document.")
+
+
+# Noise-cancellation options are plain configuration, so one instance of each is shared
+_BVC = noise_cancellation.BVC()
+_BVC_TELEPHONY = noise_cancellation.BVCTelephony()
+
 server = AgentServer()
 
 
-@server.rtc_session(agent_name="nyaya-agent")
-async def nyaya_agent(ctx: agents.JobContext):
+async def fetch_document_context(room_name: str) -> tuple[str, str]:
+    """Fetch the (document, risks) context stored by the server for this room."""
     import httpx
 
-    # Fetch document context from server via HTTP
-    document = ""
-    risks = ""
-
     server_url = os.environ.get("SERVER_URL", "http://localhost:8001")
-    room_name = ctx.room.name
 
     try:
         async with httpx.AsyncClient() as client:
             resp = await client.get(f"{server_url}/voice-context/{room_name}", timeout=10.0)
             if resp.status_code == 200:
                 data = resp.json()
-                document = data.get("markdown", "")
-                risks = data.get("risks", "")
+                return data.get("markdown", ""), data.get("risks", "")
     except Exception as e:
         print(f"[nyaya-agent] Failed to fetch context: {e}")
 
-    # Build the full system prompt with document context
-    full_prompt = SYSTEM_PROMPT.format(
-        document=document if document else "No document provided.",
-        risks=risks if risks else "No risks flagged.",
+    return "", ""
+
+
+@server.rtc_session(agent_name="nyaya-agent")
+async def nyaya_agent(ctx: agents.JobContext):
+    # Join the room while fetching document context from server via HTTP,
+    # so the connection handshake overlaps the fetch instead of following it.
+    # The job's room name is known before connecting.
+    _, (document, risks) = await asyncio.gather(
+        ctx.connect(),
+        fetch_document_context(ctx.job.room.name),
     )
+    document, clauses = compact_document(document)
+
+    # Build the full system prompt with document context
+    full_prompt = build_system_prompt(document, risks)
 
     session = AgentSession(
         llm=google.realtime.RealtimeModel(
@@ -102,16 +233,19 @@ async def nyaya_agent(ctx: agents.JobContext):
             temperature=0.6,
             instructions=full_prompt,
         ),
+        # Start drafting the reply as soon as a user transcript is available,
+        # before end-of-turn is confirmed; the draft is discarded if the user keeps talking
+        preemptive_generation=True,
     )
 
     await session.start(
         room=ctx.room,
-        agent=Agent(instructions=full_prompt),
+        agent=NyayaAgent(instructions=full_prompt, clauses=clauses),
         room_options=room_io.RoomOptions(
             audio_input=room_io.AudioInputOptions(
-                noise_cancellation=lambda params: noise_cancellation.BVCTelephony()
+                noise_cancellation=lambda params: _BVC_TELEPHONY
                 if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
-                else noise_cancellation.BVC(),
+                else _BVC,
             ),
         ),
     )
@@ -6,14 +6,16 @@ Uses strict JSON schema and low temperature for deterministic results.
 
 import json
 import logging
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import ValidationError
 
 from schemas.models import Clause, ClassifiedClause, ClauseType
 from utils.retry_helper import retry_with_exponential_backoff
+from utils.json_helper import OrjsonOutputParser
+from utils.async_helper import gather_with_concurrency, get_max_concurrency, run_sync
+from utils.cache_helper import ResponseCache, create_response_cache, make_cache_key
+from utils.llm_helper import get_llm
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +42,69 @@ class ClauseClassifierAgent:
         "Other"
     ]
     
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash", temperature: float = 0.1):
+    _CATEGORIES_LIST = "\n".join(f"- {cat}" for cat in CLASSIFICATION_CATEGORIES)
+    
+    # System prompt for single-clause classification
+    SYSTEM_PROMPT = f"""You are an expert legal document analyst specializing in contract clause classification for Indian contracts.
+
+Your task is to classify contract clauses into one of the following categories:
+
+{_CATEGORIES_LIST}
+
+Respond with ONLY a valid JSON object in this exact format:
+{{{{
+    "clause_id": "the clause identifier",
+    "type": "one of the categories above",
+    "confidence": 0.95
+}}}}
+
+Rules:
+- confidence must be a float between 0.0 and 1.0
+- type must exactly match one of the categories listed above
+- Be precise and analytical
+- Consider Indian legal context
+- If unclear, classify as "Other" with lower confidence
+- Do NOT include any text outside the JSON object
+"""
+    
+    # System prompt for classifying several clauses in one request
+    BATCH_SYSTEM_PROMPT = f"""You are an expert legal document analyst specializing in contract clause classification for Indian contracts.
+
+Your task is to classify each of the provided contract clauses into one of the following categories:
+
+{_CATEGORIES_LIST}
+
+The clauses are given as a JSON array of objects with clause_id, heading and content.
+
+Respond with ONLY a valid JSON array with one object per clause, in the same order as the input:
+[
+    {{{{
+        "clause_id": "the clause identifier",
+        "type": "one of the categories above",
+        "confidence": 0.95
+    }}}}
+]
+
+Rules:
+- Return exactly one object for every input clause, using its clause_id unchanged
+- confidence must be a float between 0.0 and 1.0
+- type must exactly match one of the categories listed above
+- Be precise and analytical
+- Consider Indian legal context
+- If unclear, classify as "Other" with lower confidence
+- Do NOT include any text outside the JSON array
+"""
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        temperature: float = 0.1,
+        max_concurrency: int = None,
+        cache: ResponseCache = None,
+        draft_model: Optional[str] = "gemini-2.5-flash-lite",
+        escalation_threshold: float = 0.8
+    ):
         """
         Initialize the clause classifier agent.
         
@@ -48,54 +112,192 @@ class ClauseClassifierAgent:
             api_key: Google API key
             model: Model to use for classification
             temperature: Temperature for LLM (0-0.2 for deterministic)
+            max_concurrency: Maximum concurrent LLM calls (default from NYAYA_LLM_CONCURRENCY or 8)
+            cache: Optional response cache (default in-memory, persisted if NYAYA_CACHE_DB is set)
+            draft_model: Cheaper model tried first (None to always use `model`)
+            escalation_threshold: Draft results below this confidence are re-classified with `model`
         """
-        self.llm = ChatGoogleGenerativeAI(
+        self.model = model
+        self.draft_model = draft_model
+        self.escalation_threshold = escalation_threshold
+        self.llm = get_llm(
             model=model,
             temperature=temperature,
-            google_api_key=api_key
+            api_key=api_key
         )
         
-        self.parser = JsonOutputParser()
+        self.parser = OrjsonOutputParser()
         
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self._get_system_prompt()),
+            ("system", self.SYSTEM_PROMPT),
             ("user", "Classify this clause:\n\nClause ID: {clause_id}\nHeading: {heading}\nContent: {content}")
         ])
         
         self.chain = self.prompt | self.llm | self.parser
         
+        # Draft stage: cheap model first, escalate low-confidence or "Other" results
+        self.draft_chain = None
+        if draft_model:
+            self.draft_llm = get_llm(
+                model=draft_model,
+                temperature=temperature,
+                api_key=api_key
+            )
+            self.draft_chain = self.prompt | self.draft_llm | self.parser
+        
+        self.draft_hits = 0
+        self.escalations = 0
+        
+        self.batch_prompt = ChatPromptTemplate.from_messages([
+            ("system", self.BATCH_SYSTEM_PROMPT),
+            ("user", "Classify the following clauses:\n\n{batch_json}")
+        ])
+        
+        self.batch_chain = self.batch_prompt | self.llm | self.parser
+        
+        self.max_concurrency = max_concurrency or get_max_concurrency()
+        
+        self._cache = cache if cache is not None else create_response_cache(
+            "clause_classifier",
+            version=self.prompt.pretty_repr() + self.batch_prompt.pretty_repr()
+        )
+        
         logger.info("ClauseClassifierAgent initialized")
     
     @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
-    def _invoke_llm_with_retry(self, inputs: dict):
+    async def _invoke_llm_with_retry(self, inputs: dict):
         """Invoke LLM chain with retry logic for rate limiting."""
-        return self.chain.invoke(inputs)
+        return await self.chain.ainvoke(inputs)
+    
+    @retry_with_exponential_backoff(max_retries=1, initial_delay=2.0, max_delay=60.0)
+    async def _invoke_draft_llm_with_retry(self, inputs: dict):
+        """Invoke draft LLM chain; fewer retries since failures escalate anyway."""
+        return await self.draft_chain.ainvoke(inputs)
+    
+    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
+    async def _invoke_batch_llm_with_retry(self, inputs: dict):
+        """Invoke batch LLM chain with retry logic for rate limiting."""
+        return await self.batch_chain.ainvoke(inputs)
     
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for classification."""
-        categories_list = "\n".join([f"- {cat}" for cat in self.CLASSIFICATION_CATEGORIES])
+    def _cache_key(self, clause: Clause) -> str:
+        """Build the content-addressed cache key for a clause."""
+        return make_cache_key(self.model, self.draft_model, clause.heading, clause.content_preview)
+    
+    def _get_cached(self, clause: Clause) -> ClassifiedClause:
+        """Return the cached classification for identical clause content, if any."""
+        cached = self._cache.get(self._cache_key(clause))
+        if cached is None:
+            return None
         
-        return f"""You are an expert legal document analyst specializing in contract clause classification for Indian contracts.
-
-Your task is to classify contract clauses into one of the following categories:
-
-{categories_list}
-
-Respond with ONLY a valid JSON object in this exact format:
-{{{{
-    "clause_id": "the clause identifier",
-    "type": "one of the categories above",
-    "confidence": 0.95
-}}}}
-
-Rules:
-- confidence must be a float between 0.0 and 1.0
-- type must exactly match one of the categories listed above
-- Be precise and analytical
-- Consider Indian legal context
-- If unclear, classify as "Other" with lower confidence
-- Do NOT include any text outside the JSON object
-"""
+        try:
+            return ClassifiedClause(clause_id=clause.clause_id, **cached)
+        except (ValidationError, TypeError):
+            return None
+    
+    def _store_cached(self, clause: Clause, classified: ClassifiedClause) -> None:
+        """Cache a successful classification under the clause content hash."""
+        self._cache.set(self._cache_key(clause), {
+            "type": classified.type.value,
+            "confidence": classified.confidence
+        })
+    
+    def _dedupe_clauses(self, clauses: List[Clause]) -> Tuple[List[str], Dict[str, Clause]]:
+        """
+        Group clauses with identical content (repeated boilerplate) so each
+        distinct clause is classified once.
+        
+        Args:
+            clauses: List of clauses to classify
+            
+        Returns:
+            Tuple of (cache key per clause, first clause for each cache key)
+        """
+        cache_keys = [self._cache_key(clause) for clause in clauses]
+        unique_clauses = {}
+        for cache_key, clause in zip(cache_keys, clauses):
+            unique_clauses.setdefault(cache_key, clause)
+        return cache_keys, unique_clauses
+    
+    @staticmethod
+    def _expand_duplicates(
+        clauses: List[Clause],
+        cache_keys: List[str],
+        unique_clauses: Dict[str, Clause],
+        unique_classified: List[ClassifiedClause]
+    ) -> List[ClassifiedClause]:
+        """
+        Map classifications of the distinct clauses back onto every clause.
+        
+        Args:
+            clauses: All clauses, in input order
+            cache_keys: Cache key per clause
+            unique_clauses: First clause for each cache key
+            unique_classified: Classifications of unique_clauses, in the same order
+            
+        Returns:
+            List of ClassifiedClause objects (same order as clauses)
+        """
+        classified_by_key = dict(zip(unique_clauses.keys(), unique_classified))
+        
+        classified_clauses = []
+        for cache_key, clause in zip(cache_keys, clauses):
+            classified = classified_by_key[cache_key]
+            if classified.clause_id != clause.clause_id:
+                classified = classified.model_copy(update={"clause_id": clause.clause_id})
+            classified_clauses.append(classified)
+        
+        if len(unique_clauses) < len(clauses):
+            logger.info(f"Reused classifications for {len(clauses) - len(unique_clauses)} duplicate clauses")
+        
+        return classified_clauses
+    
+    def get_routing_stats(self) -> dict:
+        """
+        Get draft/escalation counts for the two-stage classification.
+        
+        Returns:
+            Dict with draft_hits, escalations and draft_hit_rate
+        """
+        total = self.draft_hits + self.escalations
+        return {
+            "draft_hits": self.draft_hits,
+            "escalations": self.escalations,
+            "draft_hit_rate": self.draft_hits / total if total else 0.0
+        }
+    
+    async def _adraft_classify(self, clause: Clause, inputs: dict) -> Optional[ClassifiedClause]:
+        """
+        Classify with the draft model.
+        
+        Args:
+            clause: The clause to classify
+            inputs: Prompt inputs for the clause
+            
+        Returns:
+            ClassifiedClause if the draft is confident enough, otherwise None
+        """
+        if self.draft_chain is None:
+            return None
+        
+        try:
+            classified = ClassifiedClause.model_validate(
+                await self._invoke_draft_llm_with_retry(inputs)
+            )
+        except Exception as e:
+            logger.warning(f"Draft classification failed for {clause.clause_id}, escalating: {e}")
+            self.escalations += 1
+            return None
+        
+        if classified.confidence < self.escalation_threshold or classified.type == ClauseType.OTHER:
+            logger.info(
+                f"Escalating {clause.clause_id}: draft returned {classified.type} "
+                f"(confidence: {classified.confidence:.2f})"
+            )
+            self.escalations += 1
+            return None
+        
+        self.draft_hits += 1
+        return classified
     
     def classify_clause(self, clause: Clause) -> ClassifiedClause:
         """
@@ -107,15 +309,39 @@ Rules:
         Returns:
             ClassifiedClause with type and confidence
         """
+        return run_sync(self.aclassify_clause(clause))
+    
+    async def aclassify_clause(self, clause: Clause) -> ClassifiedClause:
+        """
+        Classify a single clause asynchronously.
+        
+        Args:
+            clause: The clause to classify
+            
+        Returns:
+            ClassifiedClause with type and confidence
+        """
+        cached = self._get_cached(clause)
+        if cached is not None:
+            logger.info(f"Cache hit for {clause.clause_id}: {cached.type}")
+            return cached
+        
+        inputs = {
+            "clause_id": clause.clause_id,
+            "heading": clause.heading,
+            "content": clause.content_preview  # Limit content length
+        }
+        
         try:
-            result = self._invoke_llm_with_retry({
-                "clause_id": clause.clause_id,
-                "heading": clause.heading,
-                "content": clause.content[:1000]  # Limit content length
-            })
+            classified = await self._adraft_classify(clause, inputs)
+            
+            if classified is None:
+                result = await self._invoke_llm_with_retry(inputs)
+                
+                # Validate and create ClassifiedClause
+                classified = ClassifiedClause.model_validate(result)
             
-            # Validate and create ClassifiedClause
-            classified = ClassifiedClause(**result)
+            self._store_cached(clause, classified)
             
             logger.info(
                 f"Classified {clause.clause_id} as {classified.type} "
@@ -152,14 +378,164 @@ Rules:
         Returns:
             List of ClassifiedClause objects
         """
-        classified_clauses = []
+        return run_sync(self.aclassify_clauses(clauses))
+    
+    async def aclassify_clauses(self, clauses: List[Clause]) -> List[ClassifiedClause]:
+        """
+        Classify multiple clauses concurrently.
+        At most max_concurrency LLM calls are in flight at once.
         
-        for clause in clauses:
-            classified = self.classify_clause(clause)
-            classified_clauses.append(classified)
+        Args:
+            clauses: List of clauses to classify
+            
+        Returns:
+            List of ClassifiedClause objects (same order as input)
+        """
+        cache_keys, unique_clauses = self._dedupe_clauses(clauses)
+        
+        unique_classified = await gather_with_concurrency(
+            self.max_concurrency,
+            [self.aclassify_clause(clause) for clause in unique_clauses.values()]
+        )
+        
+        classified_clauses = self._expand_duplicates(
+            clauses, cache_keys, unique_clauses, unique_classified
+        )
         
         logger.info(f"Successfully classified {len(classified_clauses)} clauses")
         
+        if self.draft_chain is not None:
+            logger.info(f"Draft routing: {self.get_routing_stats()}")
+        
+        return classified_clauses
+    
+    def classify_clauses_batched(
+        self,
+        clauses: List[Clause],
+        batch_size: int = 16
+    ) -> List[ClassifiedClause]:
+        """
+        Classify multiple clauses, sending several clauses per LLM request.
+        
+        Args:
+            clauses: List of clauses to classify
+            batch_size: Number of clauses per LLM request
+            
+        Returns:
+            List of ClassifiedClause objects
+        """
+        return run_sync(self.aclassify_clauses_batched(clauses, batch_size))
+    
+    async def aclassify_clauses_batched(
+        self,
+        clauses: List[Clause],
+        batch_size: int = 16
+    ) -> List[ClassifiedClause]:
+        """
+        Classify multiple clauses in batches of batch_size clauses per request.
+        Batches run concurrently; clauses missing from a batch response are
+        classified individually.
+        
+        Args:
+            clauses: List of clauses to classify
+            batch_size: Number of clauses per LLM request
+            
+        Returns:
+            List of ClassifiedClause objects (same order as input)
+        """
+        cache_keys, unique_clauses = self._dedupe_clauses(clauses)
+        to_classify = list(unique_clauses.values())
+        
+        batch_size = max(1, batch_size)
+        batches = [to_classify[i:i + batch_size] for i in range(0, len(to_classify), batch_size)]
+        
+        batch_results = await gather_with_concurrency(
+            self.max_concurrency,
+            [self._aclassify_batch(batch) for batch in batches]
+        )
+        
+        classified_clauses = self._expand_duplicates(
+            clauses, cache_keys, unique_clauses, [c for batch in batch_results for c in batch]
+        )
+        
+        logger.info(
+            f"Successfully classified {len(classified_clauses)} clauses "
+            f"in {len(batches)} batched requests"
+        )
+        
+        return classified_clauses
+    
+    async def _aclassify_batch(self, clauses: List[Clause]) -> List[ClassifiedClause]:
+        """
+        Classify one batch of clauses with a single LLM request.
+        
+        Args:
+            clauses: Clauses in this batch
+            
+        Returns:
+            List of ClassifiedClause objects (same order as input)
+        """
+        cached = {clause.clause_id: self._get_cached(clause) for clause in clauses}
+        pending = [clause for clause in clauses if cached[clause.clause_id] is None]
+        
+        by_id = {}
+        # A single uncached clause is sent on its own below
+        if len(pending) > 1:
+            try:
+                batch_json = json.dumps([
+                    {
+                        "clause_id": clause.clause_id,
+                        "heading": clause.heading,
+                        "content": clause.content_preview  # Limit content length
+                    }
+                    for clause in pending
+                ], ensure_ascii=False)
+                
+                results = await self._invoke_batch_llm_with_retry({"batch_json": batch_json})
+                
+                if not isinstance(results, list):
+                    raise ValueError(f"Expected JSON array, got {type(results).__name__}")
+                
+                for result in results:
+                    try:
+                        classified = ClassifiedClause.model_validate(result)
+                        by_id[classified.clause_id] = classified
+                    except (ValidationError, TypeError) as e:
+                        logger.warning(f"Skipping invalid batch classification entry: {e}")
+                
+            except Exception as e:
+                logger.error(f"Error classifying batch of {len(pending)} clauses: {e}")
+        
+        # Clauses missing from the batch response (or a failed batch) fall
+        # back to single-clause requests, run concurrently
+        missing = [clause for clause in pending if clause.clause_id not in by_id]
+        if missing:
+            fallback = await gather_with_concurrency(
+                self.max_concurrency,
+                [self.aclassify_clause(clause) for clause in missing]
+            )
+            by_id.update(
+                (clause.clause_id, classified) for clause, classified in zip(missing, fallback)
+            )
+        missing_ids = {clause.clause_id for clause in missing}
+        
+        classified_clauses = []
+        for clause in clauses:
+            classified = cached[clause.clause_id]
+            if classified is not None:
+                logger.info(f"Cache hit for {clause.clause_id}: {classified.type}")
+                classified_clauses.append(classified)
+                continue
+            
+            classified = by_id[clause.clause_id]
+            if clause.clause_id not in missing_ids:
+                self._store_cached(clause, classified)
+                logger.info(
+                    f"Classified {clause.clause_id} as {classified.type} "
+                    f"(confidence: {classified.confidence:.2f})"
+                )
+            classified_clauses.append(classified)
+        
         return classified_clauses
 
 
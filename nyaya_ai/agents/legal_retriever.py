@@ -4,16 +4,19 @@ Retrieves relevant Indian law sections using Gemini's web search capabilities.
 STRICT: No hallucinated citations allowed.
 """
 
-import re
 import logging
-import time
 from typing import List, Optional
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from schemas.models import Citation, RiskLevel
 from utils.retry_helper import retry_with_exponential_backoff
+from utils.json_helper import OrjsonOutputParser
+from utils.async_helper import gather_with_concurrency, get_max_concurrency, run_sync
+from utils.rate_limiter import get_shared_rate_limiter
+from utils.file_helper import write_text_atomic
+from utils.markdown_tags import index_tagged_clauses
+from utils.cache_helper import ResponseCache, create_response_cache, make_cache_key
+from utils.llm_helper import get_llm
 
 logger = logging.getLogger(__name__)
 
@@ -24,40 +27,8 @@ class LegalRetrieverAgent:
     Uses Gemini's web search capabilities to find authentic Indian law references.
     """
     
-    def __init__(self, api_key: str, model: str = "gemini-2.0-flash-exp", temperature: float = 0.1):
-        """
-        Initialize the legal retriever agent.
-        
-        Args:
-            api_key: Google API key
-            model: Model to use (must support grounding/web search)
-            temperature: Temperature for LLM
-        """
-        self.llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=api_key
-        )
-        
-        self.parser = JsonOutputParser()
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self._get_system_prompt()),
-            ("user", "Analyze this clause and find relevant legal citations:\n\nClause ID: {clause_id}\nRisk Level: {risk_level}\nClause Content: {content}\n\nPerform a web search to find the most relevant Indian law citation for this clause.")
-        ])
-        
-        self.chain = self.prompt | self.llm | self.parser
-        
-        logger.info(f"LegalRetrieverAgent initialized with {model} and web search capabilities")
-    
-    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
-    def _invoke_llm_with_retry(self, inputs: dict):
-        """Invoke LLM chain with retry logic for rate limiting."""
-        return self.chain.invoke(inputs)
-    
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for legal retrieval."""
-        return """You are an expert on Indian contract and commercial law with access to web search capabilities.
+    # System prompt for legal retrieval
+    SYSTEM_PROMPT = """You are an expert on Indian contract and commercial law with access to web search capabilities.
 
 Your task is to SEARCH THE WEB and find REAL, ACCURATE legal references from Indian laws that are relevant to the provided contract clause.
 
@@ -111,6 +82,67 @@ Example explanations:
 Do NOT include any text outside the JSON object.
 """
     
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.0-flash-exp",
+        temperature: float = 0.1,
+        max_concurrency: int = None,
+        requests_per_minute: float = 20.0,
+        cache: ResponseCache = None
+    ):
+        """
+        Initialize the legal retriever agent.
+        
+        Args:
+            api_key: Google API key
+            model: Model to use (must support grounding/web search)
+            temperature: Temperature for LLM
+            max_concurrency: Maximum concurrent LLM calls (default from NYAYA_LLM_CONCURRENCY or 4)
+            requests_per_minute: Maximum rate of web-search LLM requests, shared by all instances
+            cache: Optional response cache (default in-memory, persisted if NYAYA_CACHE_DB is set)
+        """
+        self.model = model
+        self.llm = get_llm(
+            model=model,
+            temperature=temperature,
+            api_key=api_key
+        )
+        
+        self.parser = OrjsonOutputParser()
+        
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", self.SYSTEM_PROMPT),
+            ("user", "Analyze this clause and find relevant legal citations:\n\nClause ID: {clause_id}\nRisk Level: {risk_level}\nClause Content: {content}\n\nPerform a web search to find the most relevant Indian law citation for this clause.")
+        ])
+        
+        self.chain = self.prompt | self.llm | self.parser
+        
+        self.max_concurrency = max_concurrency or get_max_concurrency(default=4)
+        self.rate_limiter = get_shared_rate_limiter(
+            "legal_retriever",
+            rate=requests_per_minute,
+            period=60.0
+        )
+        
+        self._cache = cache if cache is not None else create_response_cache(
+            "legal_retriever",
+            version=self.prompt.pretty_repr()
+        )
+        
+        logger.info(f"LegalRetrieverAgent initialized with {model} and web search capabilities")
+    
+    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
+    async def _invoke_llm_with_retry(self, inputs: dict):
+        """Invoke LLM chain with retry logic for rate limiting."""
+        await self.rate_limiter.aacquire()
+        return await self.chain.ainvoke(inputs)
+    
+    def _cache_key(self, clause_content: str, risk_level: RiskLevel) -> str:
+        """Build the cache key from the whitespace-normalized clause content."""
+        normalized = " ".join(clause_content[:1500].split())
+        return make_cache_key(self.model, risk_level.value, normalized)
+    
     def retrieve_citation(
         self,
         clause_id: str,
@@ -128,14 +160,36 @@ Do NOT include any text outside the JSON object.
         Returns:
             Citation object
         """
-        try:
-            # Add delay to avoid rate limiting
-            time.sleep(2)
+        return run_sync(self.aretrieve_citation(clause_id, clause_content, risk_level))
+    
+    async def aretrieve_citation(
+        self,
+        clause_id: str,
+        clause_content: str,
+        risk_level: RiskLevel
+    ) -> Citation:
+        """
+        Retrieve legal citation for a clause asynchronously.
+        
+        Args:
+            clause_id: ID of the clause
+            clause_content: Content of the clause
+            risk_level: Risk level of the clause
             
+        Returns:
+            Citation object
+        """
+        cache_key = self._cache_key(clause_content, risk_level)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Citation cache hit for {clause_id}")
+            return Citation(clause_id=clause_id, **cached)
+        
+        try:
             logger.info(f"Requesting citation for {clause_id} via Gemini web search")
             
             # Use Gemini with web search to find and cite relevant Indian laws
-            result = self._invoke_llm_with_retry({
+            result = await self._invoke_llm_with_retry({
                 "clause_id": clause_id,
                 "risk_level": risk_level.value,
                 "content": clause_content[:1500]
@@ -153,7 +207,8 @@ Do NOT include any text outside the JSON object.
                         result['explanation'] = truncated + "..."
             
             # Validate and create Citation
-            citation = Citation(**result)
+            citation = Citation.model_validate(result)
+            self._cache.set(cache_key, citation.model_dump(exclude={"clause_id"}))
             
             if citation.found:
                 logger.info(
@@ -176,67 +231,47 @@ Do NOT include any text outside the JSON object.
                 found=False
             )
     
-    def _insert_citation_in_markdown(
+    @staticmethod
+    def _format_citation(citation: Citation) -> str:
+        """Format a citation as an inline -ipc- tag."""
+        if citation.found:
+            return f"-ipc-{citation.section}, {citation.law_name}: {citation.explanation}-ipc-"
+        return "-ipc-not found-ipc-"
+    
+    def _insert_citations_in_markdown(
         self,
         markdown_content: str,
-        clause_id: str,
-        citation: Citation
+        citations_by_id: dict
     ) -> str:
         """
-        Insert citation tag below a risk-tagged clause.
+        Insert citation tags right after their risk-tagged clauses.
         
         Args:
             markdown_content: Current markdown content
-            clause_id: ID of clause to add citation to
-            citation: Citation to insert
+            citations_by_id: Dict mapping clause_id to Citation
             
         Returns:
             Updated markdown content
         """
-        # Find the clause and its risk tag end (inline format)
-        # Extract clause number from clause_id (e.g., clause_1 -> 1, clause_preamble -> preamble)
-        clause_num = clause_id.replace("clause_", "")
+        # One pass over all annotation tags locates every risk-tagged clause
+        index = index_tagged_clauses(markdown_content)
         
-        # For preamble, match before first numbered clause
-        if clause_num == "preamble":
-            pattern = rf'(---\n\n)(.*?)(-[hlm]r-)(\n\n1\. )'
-            
-            def replace_func(match):
-                prefix = match.group(1)
-                content_with_risk = match.group(2) + match.group(3)
-                suffix = match.group(4)
-                
-                # Create citation text
-                if citation.found:
-                    citation_text = f"-ipc-{citation.section}, {citation.law_name}: {citation.explanation}-ipc-"
-                else:
-                    citation_text = "-ipc-not found-ipc-"
-                
-                return prefix + content_with_risk + citation_text + suffix
-        else:
-            # For numbered clauses (matches all risk tags: hr, mr, lr)
-            pattern = rf'({clause_num}\. -[hlm]r-.*?-[hlm]r-)'
-            
-            def replace_func(match):
-                clause_section = match.group(1)
-                
-                # Create citation text
-                if citation.found:
-                    citation_text = f"-ipc-{citation.section}, {citation.law_name}: {citation.explanation}-ipc-"
-                else:
-                    citation_text = "-ipc-not found-ipc-"
-                
-                return clause_section + citation_text
-        
-        updated_markdown = re.sub(
-            pattern,
-            replace_func,
-            markdown_content,
-            count=1,
-            flags=re.DOTALL
+        inserts = sorted(
+            (index[clause_id].risk_end, self._format_citation(citation))
+            for clause_id, citation in citations_by_id.items()
+            if clause_id in index
         )
         
-        return updated_markdown
+        # Splice in document order so every offset refers to the original text
+        pieces = []
+        last = 0
+        for offset, citation_text in inserts:
+            pieces.append(markdown_content[last:offset])
+            pieces.append(citation_text)
+            last = offset
+        pieces.append(markdown_content[last:])
+        
+        return "".join(pieces)
     
     def process_risk_tagged_markdown(
         self,
@@ -247,6 +282,26 @@ Do NOT include any text outside the JSON object.
         """
         Process markdown file to add citations for risk-tagged clauses.
         
+        Args:
+            markdown_path: Path to the markdown file
+            clauses: List of Clause objects
+            risk_levels: Dict mapping clause_id to RiskLevel
+            
+        Returns:
+            Tuple of (list of Citations, updated_markdown_path)
+        """
+        return run_sync(self.aprocess_risk_tagged_markdown(markdown_path, clauses, risk_levels))
+    
+    async def aprocess_risk_tagged_markdown(
+        self,
+        markdown_path: str,
+        clauses: List,
+        risk_levels: dict
+    ) -> tuple[List[Citation], str]:
+        """
+        Process markdown file to add citations for risk-tagged clauses.
+        Citations are retrieved concurrently, then inserted into the markdown.
+        
         Args:
             markdown_path: Path to the markdown file
             clauses: List of Clause objects
@@ -259,32 +314,50 @@ Do NOT include any text outside the JSON object.
         with open(markdown_path, 'r', encoding='utf-8') as f:
             markdown_content = f.read()
         
-        citations = []
-        
         # Process all risk-tagged clauses (high, medium, and low)
-        for clause in clauses:
-            risk_level = risk_levels.get(clause.clause_id)
-            
-            if risk_level in [RiskLevel.HIGH, RiskLevel.MEDIUM, RiskLevel.LOW]:
-                # Retrieve citation via web search
-                citation = self.retrieve_citation(
+        tagged_clauses = [
+            clause for clause in clauses
+            if risk_levels.get(clause.clause_id) in [RiskLevel.HIGH, RiskLevel.MEDIUM, RiskLevel.LOW]
+        ]
+        
+        # Identical clause bodies (repeated boilerplate) share one lookup
+        cache_keys = [
+            self._cache_key(clause.content, risk_levels[clause.clause_id])
+            for clause in tagged_clauses
+        ]
+        unique_clauses = {}
+        for cache_key, clause in zip(cache_keys, tagged_clauses):
+            unique_clauses.setdefault(cache_key, clause)
+        
+        # Retrieve citations via web search
+        unique_citations = await gather_with_concurrency(
+            self.max_concurrency,
+            [
+                self.aretrieve_citation(
                     clause.clause_id,
                     clause.content,
-                    risk_level
-                )
-                
-                citations.append(citation)
-                
-                # Insert into markdown
-                markdown_content = self._insert_citation_in_markdown(
-                    markdown_content,
-                    clause.clause_id,
-                    citation
+                    risk_levels[clause.clause_id]
                 )
+                for clause in unique_clauses.values()
+            ]
+        )
+        citation_by_key = dict(zip(unique_clauses.keys(), unique_citations))
+        
+        citations = []
+        for cache_key, clause in zip(cache_keys, tagged_clauses):
+            citation = citation_by_key[cache_key]
+            if unique_clauses[cache_key] is not clause:
+                citation = citation.model_copy(update={"clause_id": clause.clause_id})
+            citations.append(citation)
+        
+        # Insert into markdown
+        markdown_content = self._insert_citations_in_markdown(
+            markdown_content,
+            {clause.clause_id: citation for clause, citation in zip(tagged_clauses, citations)}
+        )
         
         # Save updated markdown
-        with open(markdown_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        write_text_atomic(markdown_path, markdown_content)
         
         logger.info(
             f"Processed citations for {len(citations)} clauses. "
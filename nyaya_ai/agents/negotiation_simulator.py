@@ -4,54 +4,44 @@ Simulates contract negotiation between two parties.
 Party A seeks maximum protection, Party B seeks fairness.
 """
 
+import json
+import heapq
 import logging
+from itertools import islice
 from typing import List
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from schemas.models import NegotiationResult, NegotiationRound, RiskLevel
+from utils.json_helper import OrjsonOutputParser
+from utils.text_helper import truncate_tokens
+from utils.async_helper import gather_with_concurrency, get_max_concurrency, run_sync
+from utils.cache_helper import ResponseCache, create_response_cache, make_cache_key
+from utils.llm_helper import get_llm
 
 logger = logging.getLogger(__name__)
 
 
+def _word_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the lowercase word sets of two texts."""
+    words_a = set(a.lower().split())
+    words_b = set(b.lower().split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
 class NegotiationSimulatorAgent:
     """
     Agent that simulates contract negotiations between two parties.
     Demonstrates how clauses can be improved through negotiation.
     """
     
-    def __init__(
-        self, 
-        api_key: str, 
-        model: str = "gemini-2.5-flash",
-        temperature: float = 0.4,
-        rounds: int = 3
-    ):
-        """
-        Initialize the negotiation simulator agent.
-        
-        Args:
-            api_key: Google API key
-            model: Model to use
-            temperature: Temperature for LLM (higher for varied positions)
-            rounds: Number of negotiation rounds
-        """
-        self.llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=api_key
-        )
-        
-        self.rounds = rounds
-        self.parser = JsonOutputParser()
-        
-        logger.info(f"NegotiationSimulatorAgent initialized with {rounds} rounds")
-    
-    def _create_prompt_for_party_a(self, round_num: int) -> ChatPromptTemplate:
-        """Create prompt for Party A (seeks maximum protection)."""
-        return ChatPromptTemplate.from_messages([
-            ("system", """You are a legal negotiator representing Party A in a contract negotiation.
+    # Static system prompts. Everything that varies per call (including the
+    # round number) goes in the user message, so the system prefix is
+    # byte-identical across calls and eligible for Gemini's prefix caching.
+    # User messages lead with the clause text, which is the same in every
+    # round, and end with the round counter.
+    PARTY_A_SYSTEM_PROMPT = """You are a legal negotiator representing Party A in a contract negotiation.
 
 Your goal: Maximize protection and minimize risk for your client.
 
@@ -62,21 +52,14 @@ Guidelines:
 - Be professional but firm
 - Cite Indian Contract Act principles where applicable
 
-Current round: {round_num}/{total_rounds}
-
 Respond with ONLY a valid JSON object:
 {{
     "position": "Your proposed clause modification",
     "reasoning": "Brief justification"
 }}
-"""),
-            ("user", "Original Clause:\n{original}\n\nCurrent State:\n{current_state}\n\nOther Party's Position:\n{other_position}")
-        ])
+"""
     
-    def _create_prompt_for_party_b(self, round_num: int) -> ChatPromptTemplate:
-        """Create prompt for Party B (seeks fairness)."""
-        return ChatPromptTemplate.from_messages([
-            ("system", """You are a legal negotiator representing Party B in a contract negotiation.
+    PARTY_B_SYSTEM_PROMPT = """You are a legal negotiator representing Party B in a contract negotiation.
 
 Your goal: Maintain a fair, enforceable contract that works for both parties.
 
@@ -87,21 +70,14 @@ Guidelines:
 - Focus on practical business needs
 - Reference Indian Contract Act and standard practices
 
-Current round: {round_num}/{total_rounds}
-
 Respond with ONLY a valid JSON object:
 {{
     "position": "Your response or counter-proposal",
     "reasoning": "Brief justification"
 }}
-"""),
-            ("user", "Original Clause:\n{original}\n\nCurrent State:\n{current_state}\n\nOther Party's Position:\n{other_position}")
-        ])
+"""
     
-    def _create_compromise_prompt(self) -> ChatPromptTemplate:
-        """Create prompt for generating compromise."""
-        return ChatPromptTemplate.from_messages([
-            ("system", """You are a neutral mediator helping two parties reach a fair contract agreement.
+    COMPROMISE_SYSTEM_PROMPT = """You are a neutral mediator helping two parties reach a fair contract agreement.
 
 Analyze both positions and create a balanced compromise that:
 - Addresses concerns of both parties
@@ -113,10 +89,241 @@ Respond with ONLY a valid JSON object:
 {{
     "compromise": "Balanced clause incorporating both parties' concerns"
 }}
-"""),
+"""
+    
+    COMBINED_ROUND_SYSTEM_PROMPT = """You are simulating one round of a contract negotiation under Indian law, playing three roles in order.
+
+1. Party A's negotiator: maximize protection and minimize risk for Party A.
+   - Push for balanced terms, not one-sided in favor of the other party
+   - Add safeguards, notice periods, liability caps
+   - Request mutual obligations where currently one-sided
+   - Be professional but firm
+   - Cite Indian Contract Act principles where applicable
+
+2. Party B's negotiator: respond to Party A's position, keeping the contract fair and enforceable for both parties.
+   - Accept reasonable protections that don't harm Party B's interests
+   - Resist terms that are excessively restrictive or costly
+   - Propose middle-ground solutions
+   - Focus on practical business needs
+   - Reference Indian Contract Act and standard practices
+
+3. A neutral mediator: analyze both positions and write a balanced compromise clause that
+   - Addresses concerns of both parties
+   - Maintains legal enforceability
+   - Reflects fair business practices
+   - Complies with Indian Contract Act principles
+
+Respond with ONLY a valid JSON object:
+{{
+    "party_a": {{
+        "position": "Party A's proposed clause modification",
+        "reasoning": "Brief justification"
+    }},
+    "party_b": {{
+        "position": "Party B's response or counter-proposal",
+        "reasoning": "Brief justification"
+    }},
+    "compromise": "Balanced clause incorporating both parties' concerns"
+}}
+"""
+    
+    # Approximate token budget for clause text in each prompt
+    MAX_CLAUSE_TOKENS = 200
+    
+    PARTY_USER_PROMPT = "Original Clause:\n{original}\n\nCurrent State:\n{current_state}\n\nOther Party's Position:\n{other_position}\n\nCurrent round: {round_num}/{total_rounds}"
+    
+    def __init__(
+        self, 
+        api_key: str, 
+        model: str = "gemini-2.5-flash",
+        temperature: float = 0.4,
+        rounds: int = 3,
+        max_concurrency: int = None,
+        cache: ResponseCache = None,
+        combined_rounds: bool = True,
+        convergence_threshold: float = 0.8
+    ):
+        """
+        Initialize the negotiation simulator agent.
+        
+        Args:
+            api_key: Google API key
+            model: Model to use
+            temperature: Temperature for LLM (higher for varied positions)
+            rounds: Number of negotiation rounds
+            max_concurrency: Maximum clauses negotiated at once (default from NYAYA_LLM_CONCURRENCY or 8)
+            cache: Optional response cache (default in-memory, persisted if NYAYA_CACHE_DB is set)
+            combined_rounds: Generate both positions and the compromise in one request per round
+            convergence_threshold: Stop early once the parties' positions are at least this
+                similar (word-set Jaccard); values above 1 always run every round
+        """
+        self.model = model
+        self.temperature = temperature
+        # JSON mode: Gemini constrains decoding to valid JSON server-side
+        self.llm = get_llm(
+            model=model,
+            temperature=temperature,
+            api_key=api_key,
+            response_mime_type="application/json"
+        )
+        
+        self.rounds = rounds
+        self.combined_rounds = combined_rounds
+        self.convergence_threshold = convergence_threshold
+        self.parser = OrjsonOutputParser()
+        
+        # Prompts take everything per-round as inputs, so chains are built once
+        self.party_a_chain = self._create_prompt_for_party_a() | self.llm | self.parser
+        self.party_b_chain = self._create_prompt_for_party_b() | self.llm | self.parser
+        self.compromise_chain = self._create_compromise_prompt() | self.llm | self.parser
+        self.combined_round_chain = self._create_combined_round_prompt() | self.llm | self.parser
+        
+        self.max_concurrency = max_concurrency or get_max_concurrency()
+        
+        self._cache = cache if cache is not None else create_response_cache(
+            "negotiation_simulator",
+            version="".join((
+                self.PARTY_A_SYSTEM_PROMPT,
+                self.PARTY_B_SYSTEM_PROMPT,
+                self.COMPROMISE_SYSTEM_PROMPT,
+                self.COMBINED_ROUND_SYSTEM_PROMPT,
+                self.PARTY_USER_PROMPT
+            ))
+        )
+        
+        logger.info(f"NegotiationSimulatorAgent initialized with {rounds} rounds")
+    
+    async def _ainvoke_cached(self, role: str, chain, inputs: dict) -> dict:
+        """
+        Invoke a negotiation chain, reusing the response for identical inputs.
+        
+        Args:
+            role: Prompt identifier (party_a, party_b, compromise)
+            chain: Chain to invoke
+            inputs: Prompt inputs
+            
+        Returns:
+            Parsed JSON response
+        """
+        cache_key = make_cache_key(
+            self.model,
+            self.temperature,
+            role,
+            json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+        )
+        
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Cache hit for {role} prompt")
+            return cached
+        
+        response = await chain.ainvoke(inputs)
+        if isinstance(response, dict):
+            self._cache.set(cache_key, response)
+        
+        return response
+    
+    def _create_prompt_for_party_a(self) -> ChatPromptTemplate:
+        """Create prompt for Party A (seeks maximum protection)."""
+        return ChatPromptTemplate.from_messages([
+            ("system", self.PARTY_A_SYSTEM_PROMPT),
+            ("user", self.PARTY_USER_PROMPT)
+        ])
+    
+    def _create_prompt_for_party_b(self) -> ChatPromptTemplate:
+        """Create prompt for Party B (seeks fairness)."""
+        return ChatPromptTemplate.from_messages([
+            ("system", self.PARTY_B_SYSTEM_PROMPT),
+            ("user", self.PARTY_USER_PROMPT)
+        ])
+    
+    def _create_compromise_prompt(self) -> ChatPromptTemplate:
+        """Create prompt for generating compromise."""
+        return ChatPromptTemplate.from_messages([
+            ("system", self.COMPROMISE_SYSTEM_PROMPT),
             ("user", "Party A Position:\n{party_a}\n\nParty B Position:\n{party_b}\n\nOriginal Clause:\n{original}")
         ])
     
+    def _create_combined_round_prompt(self) -> ChatPromptTemplate:
+        """Create prompt that plays both parties and the mediator in one request."""
+        return ChatPromptTemplate.from_messages([
+            ("system", self.COMBINED_ROUND_SYSTEM_PROMPT),
+            ("user", "Original Clause:\n{original}\n\nCurrent State:\n{current_state}\n\nParty B's Previous Position:\n{other_position}\n\nCurrent round: {round_num}/{total_rounds}")
+        ])
+    
+    async def _arun_round(
+        self,
+        round_num: int,
+        original_clause: str,
+        current_state: str,
+        previous_position: str
+    ) -> tuple[str, str, str]:
+        """
+        Run one negotiation round as three requests (Party A, Party B, mediator).
+        
+        Returns:
+            Tuple of (party_a_position, party_b_position, compromise)
+        """
+        # Party A proposes
+        party_a_response = await self._ainvoke_cached("party_a", self.party_a_chain, {
+            "round_num": round_num,
+            "total_rounds": self.rounds,
+            "original": truncate_tokens(original_clause, self.MAX_CLAUSE_TOKENS),
+            "current_state": truncate_tokens(current_state, self.MAX_CLAUSE_TOKENS),
+            "other_position": previous_position
+        })
+        
+        party_a_position = party_a_response.get("position", "No change proposed")
+        
+        # Party B responds
+        party_b_response = await self._ainvoke_cached("party_b", self.party_b_chain, {
+            "round_num": round_num,
+            "total_rounds": self.rounds,
+            "original": truncate_tokens(original_clause, self.MAX_CLAUSE_TOKENS),
+            "current_state": truncate_tokens(current_state, self.MAX_CLAUSE_TOKENS),
+            "other_position": party_a_position
+        })
+        
+        party_b_position = party_b_response.get("position", "No change proposed")
+        
+        # Generate compromise for this round
+        compromise_response = await self._ainvoke_cached("compromise", self.compromise_chain, {
+            "party_a": party_a_position,
+            "party_b": party_b_position,
+            "original": truncate_tokens(original_clause, self.MAX_CLAUSE_TOKENS)
+        })
+        
+        compromise = compromise_response.get("compromise", current_state)
+        
+        return party_a_position, party_b_position, compromise
+    
+    async def _arun_combined_round(
+        self,
+        round_num: int,
+        original_clause: str,
+        current_state: str,
+        previous_position: str
+    ) -> tuple[str, str, str]:
+        """
+        Run one negotiation round as a single request returning both positions and the compromise.
+        
+        Returns:
+            Tuple of (party_a_position, party_b_position, compromise)
+        """
+        response = await self._ainvoke_cached("combined_round", self.combined_round_chain, {
+            "round_num": round_num,
+            "total_rounds": self.rounds,
+            "original": truncate_tokens(original_clause, self.MAX_CLAUSE_TOKENS),
+            "current_state": truncate_tokens(current_state, self.MAX_CLAUSE_TOKENS),
+            "other_position": previous_position
+        })
+        
+        party_a_position = (response.get("party_a") or {}).get("position", "No change proposed")
+        party_b_position = (response.get("party_b") or {}).get("position", "No change proposed")
+        compromise = response.get("compromise", current_state)
+        
+        return party_a_position, party_b_position, compromise
+    
     def simulate_negotiation(
         self,
         clause_id: str,
@@ -126,6 +333,28 @@ Respond with ONLY a valid JSON object:
         """
         Simulate a multi-round negotiation for a clause.
         
+        Args:
+            clause_id: ID of the clause
+            original_clause: Original clause text
+            risk_level: Risk level of the clause
+            
+        Returns:
+            NegotiationResult with final clause and negotiation log
+        """
+        return run_sync(self.asimulate_negotiation(clause_id, original_clause, risk_level))
+    
+    async def asimulate_negotiation(
+        self,
+        clause_id: str,
+        original_clause: str,
+        risk_level: RiskLevel
+    ) -> NegotiationResult:
+        """
+        Simulate a multi-round negotiation for a clause asynchronously.
+        Each round is one combined request, or three sequential requests
+        when combined_rounds is off (Party B answers Party A's position
+        and the compromise needs both).
+        
         Args:
             clause_id: ID of the clause
             original_clause: Original clause text
@@ -143,45 +372,16 @@ Respond with ONLY a valid JSON object:
             for round_num in range(1, self.rounds + 1):
                 logger.debug(f"Negotiation round {round_num}/{self.rounds}")
                 
-                # Party A proposes
-                party_a_prompt = self._create_prompt_for_party_a(round_num)
-                party_a_chain = party_a_prompt | self.llm | self.parser
-                
-                party_a_response = party_a_chain.invoke({
-                    "round_num": round_num,
-                    "total_rounds": self.rounds,
-                    "original": original_clause[:800],
-                    "current_state": current_state[:800],
-                    "other_position": "Initial review" if round_num == 1 else negotiation_log[-1].party_b_position
-                })
-                
-                party_a_position = party_a_response.get("position", "No change proposed")
-                
-                # Party B responds
-                party_b_prompt = self._create_prompt_for_party_b(round_num)
-                party_b_chain = party_b_prompt | self.llm | self.parser
-                
-                party_b_response = party_b_chain.invoke({
-                    "round_num": round_num,
-                    "total_rounds": self.rounds,
-                    "original": original_clause[:800],
-                    "current_state": current_state[:800],
-                    "other_position": party_a_position
-                })
-                
-                party_b_position = party_b_response.get("position", "No change proposed")
-                
-                # Generate compromise for this round
-                compromise_prompt = self._create_compromise_prompt()
-                compromise_chain = compromise_prompt | self.llm | self.parser
-                
-                compromise_response = compromise_chain.invoke({
-                    "party_a": party_a_position,
-                    "party_b": party_b_position,
-                    "original": original_clause[:800]
-                })
+                previous_position = "Initial review" if round_num == 1 else negotiation_log[-1].party_b_position
                 
-                compromise = compromise_response.get("compromise", current_state)
+                if self.combined_rounds:
+                    party_a_position, party_b_position, compromise = await self._arun_combined_round(
+                        round_num, original_clause, current_state, previous_position
+                    )
+                else:
+                    party_a_position, party_b_position, compromise = await self._arun_round(
+                        round_num, original_clause, current_state, previous_position
+                    )
                 
                 # Log this round
                 negotiation_log.append(NegotiationRound(
@@ -191,9 +391,21 @@ Respond with ONLY a valid JSON object:
                     compromise=compromise
                 ))
                 
+                converged = (
+                    compromise.strip() == current_state.strip()
+                    or _word_similarity(party_a_position, party_b_position) >= self.convergence_threshold
+                )
                 current_state = compromise
+                
+                # Parties agree: further rounds would only restate the same terms
+                if converged and round_num < self.rounds:
+                    logger.info(
+                        f"Negotiation for {clause_id} converged after round "
+                        f"{round_num}/{self.rounds}"
+                    )
+                    break
             
-            logger.info(f"Completed negotiation for {clause_id}")
+            logger.info(f"Completed negotiation for {clause_id} in {len(negotiation_log)} rounds")
             
             return NegotiationResult(
                 clause_id=clause_id,
@@ -213,7 +425,8 @@ Respond with ONLY a valid JSON object:
         self,
         clauses: List,
         risk_levels: dict,
-        top_n: int = 3
+        top_n: int = 3,
+        risk_scores: dict = None
     ) -> List[NegotiationResult]:
         """
         Simulate negotiations for top N risky clauses.
@@ -222,26 +435,77 @@ Respond with ONLY a valid JSON object:
             clauses: List of all clauses
             risk_levels: Dict mapping clause_id to RiskLevel
             top_n: Number of top risky clauses to simulate
+            risk_scores: Optional dict mapping clause_id to risk score (0-100)
             
         Returns:
             List of NegotiationResult objects
         """
-        # Get high-risk clauses
-        high_risk_clauses = [
-            c for c in clauses 
+        return run_sync(self.asimulate_top_risks(clauses, risk_levels, top_n, risk_scores))
+    
+    async def asimulate_top_risks(
+        self,
+        clauses: List,
+        risk_levels: dict,
+        top_n: int = 3,
+        risk_scores: dict = None
+    ) -> List[NegotiationResult]:
+        """
+        Simulate negotiations for top N risky clauses concurrently.
+        
+        Args:
+            clauses: List of all clauses
+            risk_levels: Dict mapping clause_id to RiskLevel
+            top_n: Number of top risky clauses to simulate
+            risk_scores: Optional dict mapping clause_id to risk score (0-100);
+                when given, the highest-scoring high-risk clauses are chosen
+            
+        Returns:
+            List of NegotiationResult objects (highest score first when risk_scores
+            is given, otherwise in clause order)
+        """
+        # Get high-risk clauses lazily
+        high_risk_clauses = (
+            c for c in clauses
             if risk_levels.get(c.clause_id) == RiskLevel.HIGH
+        )
+        
+        # Limit to top_n (ties keep clause order)
+        if risk_scores:
+            clauses_to_simulate = heapq.nlargest(
+                top_n,
+                high_risk_clauses,
+                key=lambda c: risk_scores.get(c.clause_id, 0)
+            )
+        else:
+            clauses_to_simulate = list(islice(high_risk_clauses, top_n))
+        
+        # Identical clause bodies (repeated boilerplate) share one simulation
+        dedupe_keys = [
+            make_cache_key(" ".join(clause.content.split()))
+            for clause in clauses_to_simulate
         ]
+        unique_clauses = {}
+        for dedupe_key, clause in zip(dedupe_keys, clauses_to_simulate):
+            unique_clauses.setdefault(dedupe_key, clause)
         
-        # Limit to top_n
-        clauses_to_simulate = high_risk_clauses[:top_n]
+        unique_results = await gather_with_concurrency(
+            self.max_concurrency,
+            [
+                self.asimulate_negotiation(
+                    clause.clause_id,
+                    clause.content,
+                    RiskLevel.HIGH
+                )
+                for clause in unique_clauses.values()
+            ]
+        )
+        result_by_key = dict(zip(unique_clauses.keys(), unique_results))
         
         results = []
-        for clause in clauses_to_simulate:
-            result = self.simulate_negotiation(
-                clause.clause_id,
-                clause.content,
-                RiskLevel.HIGH
-            )
+        for dedupe_key, clause in zip(dedupe_keys, clauses_to_simulate):
+            result = result_by_key[dedupe_key]
+            if unique_clauses[dedupe_key] is not clause:
+                result = result.model_copy(update={"clause_id": clause.clause_id})
             results.append(result)
         
         logger.info(f"Completed negotiation simulations for {len(results)} clauses")
@@ -4,17 +4,21 @@ Generates balanced clause rewrites for risky clauses.
 Suggests modifications to make clauses more fair and balanced.
 """
 
-import re
-import json
 import logging
-import time
 from typing import List
+
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from schemas.models import Redline, RiskLevel
 from utils.retry_helper import retry_with_exponential_backoff
+from utils.json_helper import OrjsonOutputParser
+from utils.text_helper import truncate_tokens
+from utils.async_helper import gather_with_concurrency, get_max_concurrency, run_sync
+from utils.rate_limiter import get_shared_rate_limiter
+from utils.markdown_tags import index_tagged_clauses
+from utils.file_helper import write_text_atomic
+from utils.cache_helper import ResponseCache, create_response_cache, make_cache_key
+from utils.llm_helper import get_llm
 
 logger = logging.getLogger(__name__)
 
@@ -25,56 +29,9 @@ class RedlineGeneratorAgent:
     Converts unilateral clauses to bilateral, adds safeguards.
     """
     
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash", temperature: float = 0.3):
-        """
-        Initialize the redline generator agent.
-        
-        Args:
-            api_key: Google API key
-            model: Model to use
-            temperature: Temperature for LLM (slightly higher for creativity)
-        """
-        self.llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=api_key
-        )
-        
-        self.parser = JsonOutputParser()
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self._get_system_prompt()),
-            ("user", "Generate redline:\n\nClause ID: {clause_id}\nRisk Level: {risk_level}\nOriginal: {content}\nLegal Context: {legal_context}")
-        ])
-        
-        self.chain = self.prompt | self.llm | self.parser
-        
-        logger.info("RedlineGeneratorAgent initialized")
-    
-    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
-    def _invoke_llm_with_retry(self, inputs: dict):
-        """Invoke LLM chain with retry logic for rate limiting."""
-        return self.chain.invoke(inputs)
-    
-    def _extract_json_from_response(self, response) -> dict:
-        """Extract JSON from LLM response, handling various formats."""
-        if isinstance(response, dict):
-            return response
-        response_str = str(response)
-        json_match = re.search(r'```(?:json)?\s*(.+?)\s*```', response_str, re.DOTALL)
-        if json_match:
-            response_str = json_match.group(1)
-        try:
-            return json.loads(response_str)
-        except json.JSONDecodeError:
-            json_obj_match = re.search(r'\{.+\}', response_str, re.DOTALL)
-            if json_obj_match:
-                return json.loads(json_obj_match.group(0))
-            raise ValueError(f"Invalid JSON: {response_str[:200]}")
-    
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for redline generation."""
-        return """You are an expert contract negotiation advisor specializing in Indian commercial law.
+    # Static system prompt; per-clause inputs go in the user message so the
+    # system prefix is identical across calls and eligible for prefix caching
+    SYSTEM_PROMPT = """You are an expert contract negotiation advisor specializing in Indian commercial law.
 
 Your task is to provide SHORT, ACTIONABLE advice (NOT full rewrites) on how to improve risky clauses.
 
@@ -83,7 +40,6 @@ You MUST respond with ONLY a valid JSON object. Do not include ANY text before o
 
 JSON Format (EXACT):
 {{
-    "clause_id": "the clause identifier from input",
     "original_text": "first 80-100 chars of original clause",
     "suggested_text": "2-3 short sentences of concise advice",
     "rationale": "1 short sentence why this helps"
@@ -108,6 +64,68 @@ Key Improvements:
 Return ONLY the JSON object, nothing else.
 """
     
+    # Approximate token budget for the clause text in the prompt
+    MAX_CLAUSE_TOKENS = 250
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        temperature: float = 0.3,
+        max_concurrency: int = None,
+        requests_per_minute: float = 30.0,
+        cache: ResponseCache = None
+    ):
+        """
+        Initialize the redline generator agent.
+        
+        Args:
+            api_key: Google API key
+            model: Model to use
+            temperature: Temperature for LLM (slightly higher for creativity)
+            max_concurrency: Maximum concurrent LLM calls (default from NYAYA_LLM_CONCURRENCY or 8)
+            requests_per_minute: Maximum rate of redline LLM requests, shared by all instances
+            cache: Optional response cache (default in-memory, persisted if NYAYA_CACHE_DB is set)
+        """
+        self.model = model
+        self.temperature = temperature
+        # JSON mode: Gemini constrains decoding to valid JSON server-side
+        self.llm = get_llm(
+            model=model,
+            temperature=temperature,
+            api_key=api_key,
+            response_mime_type="application/json"
+        )
+        
+        self.parser = OrjsonOutputParser()
+        
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", self.SYSTEM_PROMPT),
+            ("user", "Generate redline:\n\nRisk Level: {risk_level}\nOriginal: {content}\nLegal Context: {legal_context}")
+        ])
+        
+        self.chain = self.prompt | self.llm | self.parser
+        
+        self.max_concurrency = max_concurrency or get_max_concurrency()
+        self.rate_limiter = get_shared_rate_limiter(
+            "redline_generator",
+            rate=requests_per_minute,
+            period=60.0
+        )
+        
+        self._cache = cache if cache is not None else create_response_cache(
+            "redline_generator",
+            version=self.prompt.pretty_repr()
+        )
+        
+        logger.info("RedlineGeneratorAgent initialized")
+    
+    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
+    async def _invoke_llm_with_retry(self, inputs: dict):
+        """Invoke LLM chain with retry logic for rate limiting."""
+        await self.rate_limiter.aacquire()
+        return await self.chain.ainvoke(inputs)
+    
     def generate_redline(
         self,
         clause_id: str,
@@ -127,23 +145,52 @@ Return ONLY the JSON object, nothing else.
         Returns:
             Redline object with suggested rewrite
         """
-        try:
-            # Add delay to avoid rate limiting
-            time.sleep(2)
-            
-            # Limit content length
-            limited_content = clause_content[:1000]  # Shorter for better processing
+        return run_sync(self.agenerate_redline(clause_id, clause_content, risk_level, legal_context))
+    
+    async def agenerate_redline(
+        self,
+        clause_id: str,
+        clause_content: str,
+        risk_level: RiskLevel,
+        legal_context: str = ""
+    ) -> Redline:
+        """
+        Generate a balanced rewrite for a risky clause asynchronously.
+        
+        Args:
+            clause_id: ID of the clause
+            clause_content: Original clause content
+            risk_level: Risk level of the clause
+            legal_context: Optional legal citation context
             
-            raw_response = self._invoke_llm_with_retry({
-                "clause_id": clause_id,
+        Returns:
+            Redline object with suggested rewrite
+        """
+        # Limit content length
+        limited_content = truncate_tokens(clause_content, self.MAX_CLAUSE_TOKENS)
+        
+        cache_key = make_cache_key(
+            self.model,
+            self.temperature,
+            risk_level.value,
+            limited_content,
+            legal_context
+        )
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for redline {clause_id}")
+            return Redline(clause_id=clause_id, **cached)
+        
+        try:
+            # The prompt carries only clause content, so identical clauses
+            # produce byte-identical requests; the ID is attached here
+            # The chain's parser already tolerates code fences and prose
+            result = await self._invoke_llm_with_retry({
                 "risk_level": risk_level.value,
                 "content": limited_content,
                 "legal_context": legal_context or "No specific legal reference"
             })
             
-            # Extract and validate JSON (handles various response formats)
-            result = self._extract_json_from_response(raw_response) if not isinstance(raw_response, dict) else raw_response
-            
             # Ensure original_text is limited
             if 'original_text' in result:
                 result['original_text'] = result['original_text'][:100]
@@ -156,7 +203,9 @@ Return ONLY the JSON object, nothing else.
                 result['suggested_text'] = result['suggested_text'][:500] + "..."
             
             # Validate and create Redline
+            result['clause_id'] = clause_id
             redline = Redline(**result)
+            self._cache.set(cache_key, redline.model_dump(exclude={"clause_id"}))
             
             logger.info(f"Generated redline for {clause_id}")
             
@@ -164,8 +213,8 @@ Return ONLY the JSON object, nothing else.
             
         except Exception as e:
             logger.error(f"Error generating redline for {clause_id}: {e}")
-            if 'raw_response' in locals():
-                logger.error(f"Raw response preview: {str(raw_response)[:300]}")
+            if 'result' in locals():
+                logger.error(f"Parsed response preview: {str(result)[:300]}")
             # Return concise default redline with helpful suggestion
             return Redline(
                 clause_id=clause_id,
@@ -174,52 +223,47 @@ Return ONLY the JSON object, nothing else.
                 rationale="Standard improvements for risky clauses under Indian Contract Act"
             )
     
-    def _insert_suggestion_in_markdown(
+    @staticmethod
+    def _legal_context(citation) -> str:
+        """Format a found citation as legal context for the prompt."""
+        if citation and citation.found:
+            return f"{citation.section}, {citation.law_name}: {citation.explanation}"
+        return ""
+    
+    def _insert_suggestions_in_markdown(
         self,
         markdown_content: str,
-        clause_id: str,
-        redline: Redline
+        redlines_by_id: dict
     ) -> str:
         """
-        Insert suggestion tag below citation in markdown.
+        Insert suggestion tags right after the citations of their clauses.
         
         Args:
             markdown_content: Current markdown content
-            clause_id: ID of clause to add suggestion to
-            redline: Redline suggestion to insert
+            redlines_by_id: Dict mapping clause_id to Redline
             
         Returns:
             Updated markdown content
         """
-        # Find the clause and its citation end (inline format)
-        # Extract clause number from clause_id
-        clause_num = clause_id.replace("clause_", "")
+        # One pass over all annotation tags locates every cited clause
+        index = index_tagged_clauses(markdown_content)
         
-        if clause_num == "preamble":
-            pattern = rf'(---\n\n.*?-[hlm]r--ipc-.*?-ipc-)(\n\n1\. )'
-            
-            def replace_func(match):
-                clause_section = match.group(1)
-                suffix = match.group(2)
-                suggestion_text = f"-sg-{redline.suggested_text}-sg-"
-                return clause_section + suggestion_text + suffix
-        else:
-            pattern = rf'({clause_num}\. -[hlm]r-.*?-[hlm]r--ipc-.*?-ipc-)'
-            
-            def replace_func(match):
-                clause_section = match.group(1)
-                suggestion_text = f"-sg-{redline.suggested_text}-sg-"
-                return clause_section + suggestion_text
-        
-        updated_markdown = re.sub(
-            pattern,
-            replace_func,
-            markdown_content,
-            count=1,
-            flags=re.DOTALL
+        inserts = sorted(
+            (index[clause_id].citation_end, f"-sg-{redline.suggested_text}-sg-")
+            for clause_id, redline in redlines_by_id.items()
+            if clause_id in index and index[clause_id].citation_end is not None
         )
         
-        return updated_markdown
+        # Splice in document order so every offset refers to the original text
+        pieces = []
+        last = 0
+        for offset, suggestion_text in inserts:
+            pieces.append(markdown_content[last:offset])
+            pieces.append(suggestion_text)
+            last = offset
+        pieces.append(markdown_content[last:])
+        
+        return "".join(pieces)
     
     def process_cited_markdown(
         self,
@@ -231,6 +275,28 @@ Return ONLY the JSON object, nothing else.
         """
         Process markdown file to add suggestions for risk-tagged clauses.
         
+        Args:
+            markdown_path: Path to the markdown file
+            clauses: List of Clause objects
+            risk_levels: Dict mapping clause_id to RiskLevel
+            citations: Dict mapping clause_id to Citation
+            
+        Returns:
+            Tuple of (list of Redlines, updated_markdown_path)
+        """
+        return run_sync(self.aprocess_cited_markdown(markdown_path, clauses, risk_levels, citations))
+    
+    async def aprocess_cited_markdown(
+        self,
+        markdown_path: str,
+        clauses: List,
+        risk_levels: dict,
+        citations: dict
+    ) -> tuple[List[Redline], str]:
+        """
+        Process markdown file to add suggestions for risk-tagged clauses.
+        Redlines are generated concurrently, then inserted into the markdown.
+        
         Args:
             markdown_path: Path to the markdown file
             clauses: List of Clause objects
@@ -244,39 +310,61 @@ Return ONLY the JSON object, nothing else.
         with open(markdown_path, 'r', encoding='utf-8') as f:
             markdown_content = f.read()
         
-        redlines = []
-        
         # Process all risk-tagged clauses (high, medium, and low)
-        for clause in clauses:
-            risk_level = risk_levels.get(clause.clause_id)
-            
-            if risk_level in [RiskLevel.HIGH, RiskLevel.MEDIUM, RiskLevel.LOW]:
-                # Get legal context if available
-                citation = citations.get(clause.clause_id)
-                legal_context = ""
-                if citation and citation.found:
-                    legal_context = f"{citation.section}, {citation.law_name}: {citation.explanation}"
-                
-                # Generate redline
-                redline = self.generate_redline(
+        tagged_clauses = [
+            clause for clause in clauses
+            if risk_levels.get(clause.clause_id) in [RiskLevel.HIGH, RiskLevel.MEDIUM, RiskLevel.LOW]
+        ]
+        
+        legal_contexts = [
+            self._legal_context(citations.get(clause.clause_id))
+            for clause in tagged_clauses
+        ]
+        
+        # Identical clause bodies (repeated boilerplate) share one redline
+        dedupe_keys = [
+            make_cache_key(
+                " ".join(clause.content.split()),
+                risk_levels[clause.clause_id].value,
+                legal_context
+            )
+            for clause, legal_context in zip(tagged_clauses, legal_contexts)
+        ]
+        unique_clauses = {}
+        for dedupe_key, clause, legal_context in zip(dedupe_keys, tagged_clauses, legal_contexts):
+            unique_clauses.setdefault(dedupe_key, (clause, legal_context))
+        
+        unique_redlines = await gather_with_concurrency(
+            self.max_concurrency,
+            [
+                self.agenerate_redline(
                     clause.clause_id,
                     clause.content,
-                    risk_level,
+                    risk_levels[clause.clause_id],
                     legal_context
                 )
-                
-                redlines.append(redline)
-                
-                # Insert into markdown
-                markdown_content = self._insert_suggestion_in_markdown(
-                    markdown_content,
-                    clause.clause_id,
-                    redline
-                )
+                for clause, legal_context in unique_clauses.values()
+            ]
+        )
+        redline_by_key = dict(zip(unique_clauses.keys(), unique_redlines))
+        
+        redlines = []
+        for dedupe_key, clause in zip(dedupe_keys, tagged_clauses):
+            redline = redline_by_key[dedupe_key]
+            if unique_clauses[dedupe_key][0] is not clause:
+                redline = redline.model_copy(update={"clause_id": clause.clause_id})
+            redlines.append(redline)
+        
+        if len(unique_clauses) < len(tagged_clauses):
+            logger.info(f"Reused redlines for {len(tagged_clauses) - len(unique_clauses)} duplicate clauses")
+        
+        redlines_by_id = {clause.clause_id: redline for clause, redline in zip(tagged_clauses, redlines)}
         
-        # Save updated markdown
-        with open(markdown_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Insert into markdown and save (nothing to rewrite without suggestions)
+        if redlines_by_id:
+            updated_content = self._insert_suggestions_in_markdown(markdown_content, redlines_by_id)
+            if updated_content != markdown_content:
+                write_text_atomic(markdown_path, updated_content)
         
         logger.info(f"Generated {len(redlines)} redline suggestions")
         
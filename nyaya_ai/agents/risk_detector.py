@@ -6,12 +6,19 @@ Updates markdown with risk tags.
 """
 
 import re
+import json
+import time
+import asyncio
 import logging
 from pathlib import Path
 from typing import List
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import ValidationError
+
+try:
+    from google import genai
+except ImportError:  # Optional: only needed for the offline Batch API path
+    genai = None
 
 from schemas.models import (
     Clause, RiskAssessment, RiskLevel, RiskOutput, 
@@ -19,9 +26,41 @@ from schemas.models import (
 )
 from risk_engine import compute_clause_score
 from utils.retry_helper import retry_with_exponential_backoff
+from utils.json_helper import OrjsonOutputParser
+from utils.async_helper import gather_with_concurrency, get_max_concurrency, run_sync
+from utils.rate_limiter import get_shared_rate_limiter
+from utils.llm_helper import get_llm
+from utils.text_helper import truncate_tokens
+from utils.file_helper import write_text_atomic
+from utils.cache_helper import ResponseCache, create_response_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
+# Risk tags wrapping a clause, per risk level
+RISK_TAGS = {
+    RiskLevel.HIGH: ("-hr-", "-hr-"),
+    RiskLevel.MEDIUM: ("-mr-", "-mr-"),
+    RiskLevel.LOW: ("-lr-", "-lr-")
+}
+
+
+# Batch API job states after which no further results will appear
+_BATCH_DONE_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED"
+})
+
+# Any clause placeholder pair, matched in a single pass over the document
+_CLAUSE_PLACEHOLDER = re.compile(r'\{\{CLAUSE_([^{}]+)\}\}(.*?)\{\{/CLAUSE_\1\}\}', re.DOTALL)
+
+
+def _clause_markers(clause_id: str) -> tuple[str, str]:
+    """Opening and closing placeholders written around a clause by pdf_to_markdown."""
+    return f"{{{{CLAUSE_{clause_id}}}}}", f"{{{{/CLAUSE_{clause_id}}}}}"
+
 
 class RiskDetectorAgent:
     """
@@ -29,40 +68,11 @@ class RiskDetectorAgent:
     Uses LLM for qualitative analysis and deterministic engine for scoring.
     """
     
-    def __init__(self, api_key: str, model: str = "gemini-2.5-flash", temperature: float = 0.2):
-        """
-        Initialize the risk detector agent.
-        
-        Args:
-            api_key: Google API key
-            model: Model to use
-            temperature: Temperature for LLM
-        """
-        self.llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=api_key
-        )
-        
-        self.parser = JsonOutputParser()
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self._get_system_prompt()),
-            ("user", "Analyze this clause:\n\nClause ID: {clause_id}\nType: {clause_type}\nContent: {content}")
-        ])
-        
-        self.chain = self.prompt | self.llm | self.parser
-        
-        logger.info("RiskDetectorAgent initialized")
-    
-    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
-    def _invoke_llm_with_retry(self, inputs: dict):
-        """Invoke LLM chain with retry logic for rate limiting."""
-        return self.chain.invoke(inputs)
-    
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for risk detection."""
-        return """You are an expert legal risk analyst specializing in Indian contract law.
+    # Static system prompt; per-clause inputs go in the user message so the
+    # system prefix is byte-identical across calls. Gemini 2.5 models reuse
+    # the prefill of repeated prompt prefixes (implicit caching) at no extra
+    # setup cost, which an explicit cache of this short prompt would not beat.
+    SYSTEM_PROMPT = """You are an expert legal risk analyst specializing in Indian contract law.
 
 Your task is to analyze contract clauses and identify potential risks for the party signing the contract.
 
@@ -103,6 +113,159 @@ Be precise and conservative:
 Do NOT include any text outside the JSON object.
 """
     
+    # System prompt for assessing several clauses in one request
+    BATCH_SYSTEM_PROMPT = """You are an expert legal risk analyst specializing in Indian contract law.
+
+Your task is to analyze each of the provided contract clauses and identify potential risks for the party signing the contract.
+
+The clauses are given as a JSON array of objects with clause_id, clause_type and content.
+
+IMPORTANT: Only flag clauses that have REAL, SIGNIFICANT risks. If a clause is standard, reasonable, or balanced, return an EMPTY issues array and set risk_level to "Low".
+
+Respond with ONLY a valid JSON array with one object per clause, in the same order as the input:
+[
+    {{
+        "clause_id": "the clause identifier",
+        "risk_level": "High" or "Medium" or "Low",
+        "issues": [
+            {{
+                "issue_type": "brief issue category",
+                "explanation": "detailed explanation of the risk",
+                "trigger_terms": ["specific", "problematic", "terms"]
+            }}
+        ]
+    }}
+]
+
+Risk Level Guidelines:
+- High: Severe financial/legal exposure, unilateral termination, unlimited liability, IP loss WITHOUT safeguards
+- Medium: Moderate risk, unclear terms, one-sided provisions, needs attention but not critical
+- Low: Minor concerns, slightly imbalanced but acceptable, minor ambiguities
+
+Consider Indian legal context:
+- Indian Contract Act 1872
+- Consumer Protection laws
+- IT Act 2000
+- Standard business practices in India
+
+Rules:
+- Return exactly one object for every input clause, using its clause_id unchanged
+- Assess every clause independently
+- Standard boilerplate, balanced terms and normal business provisions = empty issues array
+- Do NOT include any text outside the JSON array
+"""
+    
+    USER_PROMPT = "Analyze this clause:\n\nClause ID: {clause_id}\nType: {clause_type}\nContent: {content}"
+    
+    BATCH_USER_PROMPT = "Analyze the following clauses:\n\n{batch_json}"
+    
+    # Approximate token budget for the clause text in the prompt
+    MAX_CLAUSE_TOKENS = 500
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        temperature: float = 0.2,
+        max_concurrency: int = None,
+        requests_per_minute: float = 60.0,
+        cache: ResponseCache = None,
+        use_batch_api: bool = False
+    ):
+        """
+        Initialize the risk detector agent.
+        
+        Args:
+            api_key: Google API key
+            model: Model to use
+            temperature: Temperature for LLM
+            max_concurrency: Maximum concurrent LLM calls (default from NYAYA_LLM_CONCURRENCY or 8)
+            requests_per_minute: Maximum rate of risk detection LLM requests, shared by all instances
+            cache: Optional response cache (default in-memory, persisted if NYAYA_CACHE_DB is set)
+            use_batch_api: Assess clauses through one offline Gemini Batch API job
+                (cheaper, but may take minutes to hours; requires google-genai)
+        """
+        if use_batch_api and genai is None:
+            raise ImportError("use_batch_api requires the google-genai package")
+        
+        self._api_key = api_key
+        self.use_batch_api = use_batch_api
+        self.model = model
+        self.temperature = temperature
+        self.llm = get_llm(
+            model=model,
+            temperature=temperature,
+            api_key=api_key
+        )
+        
+        self.parser = OrjsonOutputParser()
+        
+        # System messages are rendered once (format() only unescapes the
+        # literal JSON braces); per-call user text is a plain str.format_map,
+        # skipping prompt-template parsing on every request
+        self.system_message = SystemMessage(content=self.SYSTEM_PROMPT.format())
+        self.batch_system_message = SystemMessage(content=self.BATCH_SYSTEM_PROMPT.format())
+        
+        self.chain = self.llm | self.parser
+        
+        self.max_concurrency = max_concurrency or get_max_concurrency()
+        self.rate_limiter = get_shared_rate_limiter(
+            "risk_detector",
+            rate=requests_per_minute,
+            period=60.0
+        )
+        
+        self._cache = cache if cache is not None else create_response_cache(
+            "risk_detector",
+            version=self.SYSTEM_PROMPT + self.USER_PROMPT + self.BATCH_SYSTEM_PROMPT
+        )
+        
+        logger.info("RiskDetectorAgent initialized")
+    
+    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
+    async def _invoke_llm_with_retry(self, inputs: dict):
+        """Invoke LLM chain with retry logic for rate limiting."""
+        await self.rate_limiter.aacquire()
+        return await self.chain.ainvoke([
+            self.system_message,
+            HumanMessage(content=self.USER_PROMPT.format_map(inputs))
+        ])
+    
+    @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
+    async def _invoke_batch_llm_with_retry(self, inputs: dict):
+        """Invoke batch LLM chain with retry logic for rate limiting."""
+        await self.rate_limiter.aacquire()
+        return await self.chain.ainvoke([
+            self.batch_system_message,
+            HumanMessage(content=self.BATCH_USER_PROMPT.format_map(inputs))
+        ])
+    
+    def _cache_key(self, clause: Clause, clause_type: str) -> str:
+        """Build the cache key from the model settings and the clause as sent to the LLM."""
+        return make_cache_key(self.model, self.temperature, clause_type, self._limited_content(clause))
+    
+    def _limited_content(self, clause: Clause) -> str:
+        """Clause content cut to the prompt token budget (memoized per content)."""
+        return truncate_tokens(clause.content, self.MAX_CLAUSE_TOKENS)
+    
+    def _get_cached(self, clause: Clause, clause_type: str) -> RiskAssessment:
+        """Return the cached assessment for identical clause content, if any."""
+        cached = self._cache.get(self._cache_key(clause, clause_type))
+        if cached is None:
+            return None
+        
+        try:
+            return RiskAssessment(clause_id=clause.clause_id, **cached)
+        except (ValidationError, TypeError):
+            return None
+    
+    def _store_cached(self, clause: Clause, clause_type: str, risk_assessment: RiskAssessment) -> None:
+        """Cache a successful assessment under the clause content hash."""
+        self._cache.set(
+            self._cache_key(clause, clause_type),
+            risk_assessment.model_dump(mode="json", exclude={"clause_id"})
+        )
+    
     def detect_risk(self, clause: Clause, clause_type: str) -> RiskAssessment:
         """
         Detect risks in a single clause using LLM.
@@ -114,15 +277,34 @@ Do NOT include any text outside the JSON object.
         Returns:
             RiskAssessment with risk level and issues
         """
+        return run_sync(self.adetect_risk(clause, clause_type))
+    
+    async def adetect_risk(self, clause: Clause, clause_type: str) -> RiskAssessment:
+        """
+        Detect risks in a single clause using LLM asynchronously.
+        
+        Args:
+            clause: The clause to analyze
+            clause_type: The classified type of the clause
+            
+        Returns:
+            RiskAssessment with risk level and issues
+        """
+        cached = self._get_cached(clause, clause_type)
+        if cached is not None:
+            logger.info(f"Cache hit for risk of {clause.clause_id}: {cached.risk_level}")
+            return cached
+        
         try:
-            result = self._invoke_llm_with_retry({
+            result = await self._invoke_llm_with_retry({
                 "clause_id": clause.clause_id,
                 "clause_type": clause_type,
-                "content": clause.content[:2000]  # Limit content
+                "content": self._limited_content(clause)
             })
             
             # Validate and create RiskAssessment
             risk_assessment = RiskAssessment(**result)
+            self._store_cached(clause, clause_type, risk_assessment)
             
             logger.info(
                 f"Risk detected for {clause.clause_id}: {risk_assessment.risk_level} "
@@ -140,6 +322,222 @@ Do NOT include any text outside the JSON object.
                 issues=[]
             )
     
+    async def adetect_risk_batch(
+        self,
+        clauses: List[Clause],
+        classified_types: dict
+    ) -> List[RiskAssessment]:
+        """
+        Detect risks in several clauses with a single LLM request.
+        Clauses missing from (or invalid in) the response are assessed individually.
+        
+        Args:
+            clauses: Clauses in this batch
+            classified_types: Dict mapping clause_id to clause_type
+            
+        Returns:
+            List of RiskAssessment objects (same order as input)
+        """
+        clause_types = {
+            clause.clause_id: classified_types.get(clause.clause_id, "Other")
+            for clause in clauses
+        }
+        cached = {
+            clause.clause_id: self._get_cached(clause, clause_types[clause.clause_id])
+            for clause in clauses
+        }
+        pending = [clause for clause in clauses if cached[clause.clause_id] is None]
+        
+        by_id = {}
+        # A single uncached clause is sent on its own below
+        if len(pending) > 1:
+            try:
+                batch_json = json.dumps([
+                    {
+                        "clause_id": clause.clause_id,
+                        "clause_type": clause_types[clause.clause_id],
+                        "content": self._limited_content(clause)
+                    }
+                    for clause in pending
+                ], ensure_ascii=False)
+                
+                results = await self._invoke_batch_llm_with_retry({"batch_json": batch_json})
+                
+                if not isinstance(results, list):
+                    raise ValueError(f"Expected JSON array, got {type(results).__name__}")
+                
+                for result in results:
+                    try:
+                        risk_assessment = RiskAssessment.model_validate(result)
+                        by_id[risk_assessment.clause_id] = risk_assessment
+                    except (ValidationError, TypeError) as e:
+                        logger.warning(f"Skipping invalid batch risk entry: {e}")
+                
+            except Exception as e:
+                logger.error(f"Error detecting risk for batch of {len(pending)} clauses: {e}")
+        
+        # Clauses missing from the batch response (or a failed batch) fall
+        # back to single-clause requests, run concurrently
+        missing = [clause for clause in pending if clause.clause_id not in by_id]
+        if missing:
+            fallback = await gather_with_concurrency(
+                self.max_concurrency,
+                [self.adetect_risk(clause, clause_types[clause.clause_id]) for clause in missing]
+            )
+            by_id.update(
+                (clause.clause_id, assessment) for clause, assessment in zip(missing, fallback)
+            )
+        missing_ids = {clause.clause_id for clause in missing}
+        
+        risk_assessments = []
+        for clause in clauses:
+            risk_assessment = cached[clause.clause_id]
+            if risk_assessment is not None:
+                logger.info(f"Cache hit for risk of {clause.clause_id}: {risk_assessment.risk_level}")
+                risk_assessments.append(risk_assessment)
+                continue
+            
+            risk_assessment = by_id[clause.clause_id]
+            if clause.clause_id not in missing_ids:
+                self._store_cached(clause, clause_types[clause.clause_id], risk_assessment)
+                logger.info(
+                    f"Risk detected for {clause.clause_id}: {risk_assessment.risk_level} "
+                    f"with {len(risk_assessment.issues)} issues"
+                )
+            risk_assessments.append(risk_assessment)
+        
+        return risk_assessments
+    
+    async def adetect_risk_offline(
+        self,
+        clauses: List[Clause],
+        classified_types: dict,
+        poll_interval: float = 30.0,
+        max_poll_interval: float = 300.0,
+        timeout: float = 24 * 3600
+    ) -> List[RiskAssessment]:
+        """
+        Detect risks in all clauses with a single Gemini Batch API job.
+        Batch jobs are billed at a discount and bypass the interactive rate
+        limit, at the cost of latency. Cached clauses are not resubmitted,
+        and clauses without a usable batch result are assessed online.
+        
+        Args:
+            clauses: Clauses to analyze
+            classified_types: Dict mapping clause_id to clause_type
+            poll_interval: Initial seconds between job status checks
+            max_poll_interval: Maximum seconds between job status checks
+            timeout: Seconds to wait for the job before falling back to online requests
+            
+        Returns:
+            List of RiskAssessment objects (same order as input)
+        """
+        clause_types = {
+            clause.clause_id: classified_types.get(clause.clause_id, "Other")
+            for clause in clauses
+        }
+        cached = {
+            clause.clause_id: self._get_cached(clause, clause_types[clause.clause_id])
+            for clause in clauses
+        }
+        pending = [clause for clause in clauses if cached[clause.clause_id] is None]
+        
+        by_id = {}
+        if pending:
+            try:
+                client = genai.Client(api_key=self._api_key)
+                job = await client.aio.batches.create(
+                    model=self.model,
+                    src=[
+                        {
+                            "contents": [{
+                                "role": "user",
+                                "parts": [{"text": self.USER_PROMPT.format_map({
+                                    "clause_id": clause.clause_id,
+                                    "clause_type": clause_types[clause.clause_id],
+                                    "content": self._limited_content(clause)
+                                })}]
+                            }],
+                            "config": {
+                                "system_instruction": self.system_message.content,
+                                "temperature": self.temperature,
+                                "response_mime_type": "application/json"
+                            }
+                        }
+                        for clause in pending
+                    ],
+                    config={"display_name": f"nyaya-risk-{len(pending)}-clauses"}
+                )
+                logger.info(f"Submitted batch job {job.name} for {len(pending)} clauses")
+                
+                job = await self._await_batch_job(client, job, poll_interval, max_poll_interval, timeout)
+                
+                # Inlined responses come back in request order
+                responses = (job.dest.inlined_responses if job.dest else None) or []
+                for clause, inlined in zip(pending, responses):
+                    if inlined.error or inlined.response is None:
+                        continue
+                    try:
+                        result = self.parser.parse(inlined.response.text)
+                        risk_assessment = RiskAssessment.model_validate({**result, "clause_id": clause.clause_id})
+                    except Exception as e:
+                        logger.warning(f"Skipping invalid batch job result for {clause.clause_id}: {e}")
+                        continue
+                    self._store_cached(clause, clause_types[clause.clause_id], risk_assessment)
+                    by_id[clause.clause_id] = risk_assessment
+                
+                logger.info(f"Batch job {job.name} returned {len(by_id)}/{len(pending)} assessments")
+                
+            except Exception as e:
+                logger.error(f"Error in batch job risk detection, falling back to online requests: {e}")
+        
+        # Anything the batch job did not cover goes through the online path
+        missing = [
+            clause for clause in pending
+            if clause.clause_id not in by_id
+        ]
+        fallback = await gather_with_concurrency(
+            self.max_concurrency,
+            [self.adetect_risk(clause, clause_types[clause.clause_id]) for clause in missing]
+        )
+        by_id.update((clause.clause_id, a) for clause, a in zip(missing, fallback))
+        
+        return [cached[clause.clause_id] or by_id[clause.clause_id] for clause in clauses]
+    
+    async def _await_batch_job(
+        self,
+        client,
+        job,
+        poll_interval: float,
+        max_poll_interval: float,
+        timeout: float
+    ):
+        """
+        Poll a Batch API job with exponential backoff until it finishes.
+        
+        Returns:
+            The finished BatchJob
+            
+        Raises:
+            RuntimeError: If the job ends without results
+            TimeoutError: If the job does not finish within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        
+        while job.state not in _BATCH_DONE_STATES:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch job {job.name} still {job.state} after {timeout:.0f}s")
+            
+            await asyncio.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, max_poll_interval)
+            job = await client.aio.batches.get(name=job.name)
+            logger.debug(f"Batch job {job.name}: {job.state}")
+        
+        if job.state not in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+            raise RuntimeError(f"Batch job {job.name} ended in {job.state}: {job.error}")
+        
+        return job
+    
     def compute_and_tag_risk(
         self,
         clause: Clause,
@@ -161,33 +559,42 @@ Do NOT include any text outside the JSON object.
         risk_assessment = self.detect_risk(clause, clause_type)
         
         # Step 2: Deterministic scoring
-        clause_score = compute_clause_score(
-            clause.clause_id,
-            clause.content,
-            risk_assessment.risk_level
-        )
-        
-        # Check if clause has actual issues
-        has_issues = len(risk_assessment.issues) > 0
+        risk_output = self._score_clause(clause, risk_assessment)
         
         # Step 3: Tag markdown (only if has issues)
         updated_markdown = self._tag_markdown(
             markdown_content,
             clause.clause_id,
             risk_assessment.risk_level,
-            has_issues=has_issues
+            has_issues=len(risk_assessment.issues) > 0
         )
         
-        # Create output
-        risk_output = RiskOutput(
+        return risk_output, updated_markdown
+    
+    def _score_clause(self, clause: Clause, risk_assessment: RiskAssessment) -> RiskOutput:
+        """
+        Compute the deterministic score for an assessed clause.
+        
+        Args:
+            clause: The analyzed clause
+            risk_assessment: LLM risk assessment for the clause
+            
+        Returns:
+            RiskOutput for the clause
+        """
+        clause_score = compute_clause_score(
+            clause.clause_id,
+            clause.content,
+            risk_assessment.risk_level
+        )
+        
+        return RiskOutput(
             clause_id=clause.clause_id,
             risk_level=risk_assessment.risk_level,
             risk_score=clause_score.final_risk_score,
             scoring_breakdown=clause_score.scoring_breakdown,
             updated_markdown_path=""  # Will be set by caller
         )
-        
-        return risk_output, updated_markdown
     
     def _tag_markdown(
         self,
@@ -208,44 +615,64 @@ Do NOT include any text outside the JSON object.
         Returns:
             Updated markdown content with risk tags (or untagged if no issues)
         """
-        # If no issues, remove placeholders but don't tag
-        if not has_issues:
+        if has_issues:
+            start_tag, end_tag = RISK_TAGS[risk_level]
+        else:
             # Just remove placeholders without adding risk tags
-            pattern = rf'\{{\{{CLAUSE_{re.escape(clause_id)}\}}\}}(.*?)\{{\{{/CLAUSE_{re.escape(clause_id)}\}}\}}'
-            
-            def replace_func(match):
-                content = match.group(1)
-                return content  # Return content without tags
-            
-            updated_markdown = re.sub(pattern, replace_func, markdown_content, flags=re.DOTALL)
-            return updated_markdown
-        
-        # Define risk tags for all three levels
-        risk_tags = {
-            RiskLevel.HIGH: ("-hr-", "-hr-"),
-            RiskLevel.MEDIUM: ("-mr-", "-mr-"),
-            RiskLevel.LOW: ("-lr-", "-lr-")
-        }
+            start_tag, end_tag = "", ""
         
-        start_tag, end_tag = risk_tags[risk_level]
+        # Placeholders are literal markers, so plain string search suffices
+        open_marker, close_marker = _clause_markers(clause_id)
         
-        # Find clause placeholder in markdown
-        pattern = rf'\{{\{{CLAUSE_{re.escape(clause_id)}\}}\}}(.*?)\{{\{{/CLAUSE_{re.escape(clause_id)}\}}\}}'
+        start = markdown_content.find(open_marker)
+        if start == -1:
+            return markdown_content
         
-        def replace_func(match):
-            content = match.group(1)
-            # Replace placeholders with risk-tagged content
-            return f"{start_tag}{content}{end_tag}"
+        end = markdown_content.find(close_marker, start + len(open_marker))
+        if end == -1:
+            return markdown_content
         
-        updated_markdown = re.sub(pattern, replace_func, markdown_content, flags=re.DOTALL)
+        return "".join((
+            markdown_content[:start],
+            start_tag,
+            markdown_content[start + len(open_marker):end],
+            end_tag,
+            markdown_content[end + len(close_marker):]
+        ))
+    
+    def _tag_all_clauses(self, markdown_content: str, risk_assessments: List[RiskAssessment]) -> str:
+        """
+        Replace every clause placeholder in one pass over the markdown.
+        Clauses with issues are wrapped in their risk tags; the rest are
+        left untagged.
         
-        return updated_markdown
+        Args:
+            markdown_content: Markdown content with clause placeholders
+            risk_assessments: Risk assessments of the clauses
+            
+        Returns:
+            Updated markdown content
+        """
+        tags = {
+            a.clause_id: RISK_TAGS[a.risk_level] if a.issues else ("", "")
+            for a in risk_assessments
+        }
+        
+        def replace_func(match):
+            clause_tags = tags.get(match.group(1))
+            if clause_tags is None:
+                return match.group(0)
+            start_tag, end_tag = clause_tags
+            return f"{start_tag}{match.group(2)}{end_tag}"
+        
+        return _CLAUSE_PLACEHOLDER.sub(replace_func, markdown_content)
     
     def process_all_clauses(
         self,
         clauses: List[Clause],
         classified_types: dict,
-        markdown_path: str
+        markdown_path: str,
+        batch_size: int = 1
     ) -> tuple[List[RiskOutput], str]:
         """
         Process all clauses for risk detection and tagging.
@@ -254,30 +681,88 @@ Do NOT include any text outside the JSON object.
             clauses: List of clauses to process
             classified_types: Dict mapping clause_id to clause_type
             markdown_path: Path to markdown file
+            batch_size: Number of clauses per LLM request (1 sends each clause on its own)
+            
+        Returns:
+            Tuple of (list of RiskOutputs, updated_markdown_path)
+        """
+        return run_sync(self.aprocess_all_clauses(clauses, classified_types, markdown_path, batch_size))
+    
+    async def aprocess_all_clauses(
+        self,
+        clauses: List[Clause],
+        classified_types: dict,
+        markdown_path: str,
+        batch_size: int = 1
+    ) -> tuple[List[RiskOutput], str]:
+        """
+        Process all clauses for risk detection and tagging.
+        LLM assessments run concurrently (or as one offline Batch API job
+        when use_batch_api is set); the markdown is then tagged in a
+        single pass.
+        
+        Args:
+            clauses: List of clauses to process
+            classified_types: Dict mapping clause_id to clause_type
+            markdown_path: Path to markdown file
+            batch_size: Number of clauses per LLM request (1 sends each clause on its own)
             
         Returns:
             Tuple of (list of RiskOutputs, updated_markdown_path)
         """
         # Read markdown content
-        with open(markdown_path, 'r', encoding='utf-8') as f:
-            markdown_content = f.read()
+        markdown_content = Path(markdown_path).read_text(encoding='utf-8')
         
-        risk_outputs = []
+        # Identical clauses of the same type (repeated boilerplate) share one assessment
+        cache_keys = [
+            self._cache_key(clause, classified_types.get(clause.clause_id, "Other"))
+            for clause in clauses
+        ]
+        unique_clauses = {}
+        for cache_key, clause in zip(cache_keys, clauses):
+            unique_clauses.setdefault(cache_key, clause)
+        to_assess = list(unique_clauses.values())
         
-        for clause in clauses:
-            clause_type = classified_types.get(clause.clause_id, "Other")
-            
-            risk_output, markdown_content = self.compute_and_tag_risk(
-                clause,
-                clause_type,
-                markdown_content
+        if self.use_batch_api:
+            unique_assessments = await self.adetect_risk_offline(to_assess, classified_types)
+        elif batch_size > 1:
+            batches = [to_assess[i:i + batch_size] for i in range(0, len(to_assess), batch_size)]
+            batch_results = await gather_with_concurrency(
+                self.max_concurrency,
+                [self.adetect_risk_batch(batch, classified_types) for batch in batches]
             )
-            
-            risk_outputs.append(risk_output)
+            unique_assessments = [a for batch in batch_results for a in batch]
+        else:
+            unique_assessments = await gather_with_concurrency(
+                self.max_concurrency,
+                [
+                    self.adetect_risk(clause, classified_types.get(clause.clause_id, "Other"))
+                    for clause in to_assess
+                ]
+            )
+        assessment_by_key = dict(zip(unique_clauses.keys(), unique_assessments))
+        
+        if len(to_assess) < len(clauses):
+            logger.info(f"Reused risk assessments for {len(clauses) - len(to_assess)} duplicate clauses")
+        
+        # Key assessments by the requested clause, whatever ID the model echoed
+        risk_assessments = []
+        for cache_key, clause in zip(cache_keys, clauses):
+            a = assessment_by_key[cache_key]
+            if a.clause_id != clause.clause_id:
+                a = a.model_copy(update={"clause_id": clause.clause_id})
+            risk_assessments.append(a)
+        
+        risk_outputs = [
+            self._score_clause(clause, risk_assessment)
+            for clause, risk_assessment in zip(clauses, risk_assessments)
+        ]
+        
+        updated_content = self._tag_all_clauses(markdown_content, risk_assessments)
         
-        # Save updated markdown
-        with open(markdown_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Save updated markdown (skipped when there were no placeholders to replace)
+        if updated_content != markdown_content:
+            write_text_atomic(markdown_path, updated_content)
         
         logger.info(f"Processed {len(risk_outputs)} clauses and updated markdown")
         
@@ -288,15 +773,20 @@ Do NOT include any text outside the JSON object.
         return risk_outputs, markdown_path
 
 
-def create_risk_detector_agent(api_key: str, model: str = "gemini-2.5-flash") -> RiskDetectorAgent:
+def create_risk_detector_agent(
+    api_key: str,
+    model: str = "gemini-2.5-flash",
+    use_batch_api: bool = False
+) -> RiskDetectorAgent:
     """
     Factory function to create a RiskDetectorAgent.
     
     Args:
         api_key: Google API key
         model: Model name to use
+        use_batch_api: Use the offline Gemini Batch API (for non-interactive pipelines)
         
     Returns:
         Configured RiskDetectorAgent
     """
-    return RiskDetectorAgent(api_key=api_key, model=model)
+    return RiskDetectorAgent(api_key=api_key, model=model, use_batch_api=use_batch_api)
@@ -7,8 +7,6 @@ Provides top risks and actionable recommendations.
 import logging
 from typing import List, Dict
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from schemas.models import (
     ExecutiveSummary, TopRisk, RiskLevel, 
@@ -16,6 +14,9 @@ from schemas.models import (
 )
 from risk_engine import compute_contract_score
 from utils.retry_helper import retry_with_exponential_backoff
+from utils.json_helper import OrjsonOutputParser
+from utils.llm_helper import get_llm
+from utils.async_helper import run_sync
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +36,13 @@ class SummaryAgent:
             model: Model to use
             temperature: Temperature for LLM
         """
-        self.llm = ChatGoogleGenerativeAI(
+        self.llm = get_llm(
             model=model,
             temperature=temperature,
-            google_api_key=api_key
+            api_key=api_key
         )
         
-        self.parser = JsonOutputParser()
+        self.parser = OrjsonOutputParser()
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", self._get_system_prompt()),
@@ -53,9 +54,9 @@ class SummaryAgent:
         logger.info("SummaryAgent initialized")
     
     @retry_with_exponential_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0)
-    def _invoke_llm_with_retry(self, inputs: dict):
+    async def _invoke_llm_with_retry(self, inputs: dict):
         """Invoke LLM chain with retry logic for rate limiting."""
-        return self.chain.invoke(inputs)
+        return await self.chain.ainvoke(inputs)
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for summary generation."""
@@ -147,30 +148,59 @@ Create a clear, non-technical summary for business stakeholders.
         Returns:
             ExecutiveSummary object
         """
-        # Prepare high risk details
-        high_risk_clauses = [
-            c for c in clauses 
-            if risk_levels.get(c.clause_id) == RiskLevel.HIGH
-        ]
+        return run_sync(self.agenerate_summary(
+            clauses, risk_levels, clause_scores, classified_types, contract_risk
+        ))
+    
+    async def agenerate_summary(
+        self,
+        clauses: List,
+        risk_levels: Dict[str, RiskLevel],
+        clause_scores: List[ClauseRiskScore],
+        classified_types: Dict[str, str],
+        contract_risk: ContractRiskSummary
+    ) -> ExecutiveSummary:
+        """
+        Generate executive summary of the contract analysis asynchronously.
         
+        Args:
+            clauses: List of all clauses
+            risk_levels: Dict mapping clause_id to RiskLevel
+            clause_scores: List of clause risk scores
+            classified_types: Dict mapping clause_id to clause type
+            contract_risk: Contract-level risk summary
+            
+        Returns:
+            ExecutiveSummary object
+        """
+        # Collect the first 5 high and medium risk clauses in one pass
+        high_risk_clauses = []
+        medium_risk_clauses = []
+        for c in clauses:
+            level = risk_levels.get(c.clause_id)
+            if level == RiskLevel.HIGH:
+                if len(high_risk_clauses) < 5:
+                    high_risk_clauses.append(c)
+            elif level == RiskLevel.MEDIUM:
+                if len(medium_risk_clauses) < 5:
+                    medium_risk_clauses.append(c)
+            if len(high_risk_clauses) == 5 and len(medium_risk_clauses) == 5:
+                break
+        
+        # Prepare high risk details
         high_risk_details = "\n".join([
             f"- {c.clause_id} ({classified_types.get(c.clause_id, 'Unknown')}): {c.heading} - {c.content[:150]}..."
-            for c in high_risk_clauses[:5]
+            for c in high_risk_clauses
         ]) or "None"
         
         # Prepare medium risk details
-        medium_risk_clauses = [
-            c for c in clauses 
-            if risk_levels.get(c.clause_id) == RiskLevel.MEDIUM
-        ]
-        
         medium_risk_details = "\n".join([
             f"- {c.clause_id} ({classified_types.get(c.clause_id, 'Unknown')}): {c.heading}"
-            for c in medium_risk_clauses[:5]
+            for c in medium_risk_clauses
         ]) or "None"
         
         try:
-            result = self._invoke_llm_with_retry({
+            result = await self._invoke_llm_with_retry({
                 "overall_risk_score": contract_risk.overall_risk_score,
                 "high_pct": contract_risk.risk_distribution.high,
                 "medium_pct": contract_risk.risk_distribution.medium,
@@ -4,21 +4,31 @@ Provides REST API endpoints for contract analysis
 """
 
 import os
+import gzip
+import asyncio
+import shutil
+import hashlib
+import time
+import uuid
 import logging
-from pathlib import Path
-from typing import Dict, Any
+import concurrent.futures
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Optional, Callable
 from datetime import datetime
 import tempfile
-import json
+from collections import Counter
+from functools import partial
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+import aiofiles
+import orjson
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from orchestrator.workflow import create_workflow
-from agents.summary_agent import create_summary_agent
+from utils.report_builder import build_risk_report
 
 # Load environment variables
 load_dotenv()
@@ -49,42 +59,45 @@ app.add_middleware(
 # Global workflow instance
 workflow = None
 
+# Thread pool for the blocking analysis pipeline, created on startup
+executor = None
+
+# Chunk size for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Progress event queues of background analysis jobs, by job ID
+_job_events: Dict[str, asyncio.Queue] = {}
+_job_tasks = set()
+
+# Seconds to keep a finished job's events for a client to collect
+JOB_EVENTS_TTL = 600.0
+
+# Job outputs never change once written, so clients and proxies may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Download media types by extension (compressible types for proxies/CDNs)
+DOWNLOAD_MEDIA_TYPES = {
+    ".json": "application/json",
+    ".md": "text/markdown; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8",
+}
+
 
-def truncate_to_complete_sentence(text: str, max_length: int = 400) -> str:
-    """
-    Truncate text to a reasonable length, but only at sentence boundaries.
-    If text is longer than max_length, find the last complete sentence within that limit.
-    
-    Args:
-        text: The text to truncate
-        max_length: Maximum character length before truncation
-    
-    Returns:
-        Truncated text ending with a complete sentence
-    """
-    if len(text) <= max_length:
-        return text
-    
-    # Find the last sentence ending within max_length
-    truncated = text[:max_length]
-    
-    # Look for sentence endings: period, exclamation, question mark
-    last_period = truncated.rfind('.')
-    last_exclamation = truncated.rfind('!')
-    last_question = truncated.rfind('?')
-    
-    # Find the rightmost sentence ending
-    last_sentence_end = max(last_period, last_exclamation, last_question)
-    
-    if last_sentence_end > 0:
-        # Include the punctuation mark
-        return truncated[:last_sentence_end + 1]
-    else:
-        # No sentence ending found, just truncate and add ellipsis
-        return truncated.rstrip() + "..."
 output_dir = Path("api_outputs")
 output_dir.mkdir(exist_ok=True)
 
+# Analysis results of previously seen contracts, by PDF SHA-256
+result_cache_dir = output_dir / "_result_cache"
+result_cache_dir.mkdir(exist_ok=True)
+
+# Total size of cached results before the least recently used are evicted
+RESULT_CACHE_MAX_BYTES = int(os.getenv("NYAYA_RESULT_CACHE_MAX_BYTES", str(64 << 20)))
+
+
+def _gzip_path(path: Path) -> Path:
+    """Path of the gzip-compressed copy of an output file."""
+    return path.with_name(path.name + ".gz")
+
 
 class HealthResponse(BaseModel):
     status: str
@@ -116,7 +129,7 @@ class AnalysisResult(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize workflow on startup"""
-    global workflow
+    global workflow, executor
     api_key = os.getenv("GOOGLE_API_KEY")
     
     if not api_key:
@@ -125,10 +138,27 @@ async def startup_event():
     
     try:
         workflow = create_workflow(api_key=api_key)
+        # Reuse the workflow's summary agent for formatting outputs
+        app.state.summary_agent = workflow.summary_agent
         logger.info("NyayaAI workflow initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize workflow: {e}")
         raise
+    
+    # Analyses run in worker threads so the event loop keeps serving requests
+    max_workers = int(os.getenv("NYAYA_API_WORKERS", "4"))
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix="nyaya-analysis"
+    )
+    logger.info(f"Analysis thread pool started with {max_workers} workers")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Shut down the analysis thread pool"""
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 @app.get("/", response_model=Dict[str, str])
@@ -154,207 +184,410 @@ async def health_check():
     )
 
 
-def save_analysis_outputs(final_state: Dict[str, Any], job_dir: Path, job_id: str):
+async def _write_risk_report(final_state: Dict[str, Any], job_dir: Path, job_id: str) -> Path:
+    """
+    Write the risk report JSON for a job.
+    The report is stored as compact, gzip-compressed JSON next to its
+    logical path; /download serves it under the plain .json name.
+    """
+    risk_report = build_risk_report(final_state)
+    
+    risk_report_path = job_dir / f"risk_report_{job_id}.json"
+    async with aiofiles.open(_gzip_path(risk_report_path), 'wb') as f:
+        await f.write(gzip.compress(orjson.dumps(risk_report), compresslevel=3))
+    
+    logger.info(f"Risk report saved: {risk_report_path}")
+    return risk_report_path
+
+
+async def _write_exec_summary(final_state: Dict[str, Any], job_dir: Path, job_id: str) -> Optional[Path]:
+    """Write the executive summary text for a job, if one was generated."""
+    if not final_state.get("executive_summary"):
+        return None
+    
+    summary_text = app.state.summary_agent.create_executive_summary_text(
+        final_state["executive_summary"]
+    )
+    
+    summary_path = job_dir / f"executive_summary_{job_id}.txt"
+    async with aiofiles.open(summary_path, 'w', encoding='utf-8') as f:
+        await f.write(summary_text)
+    
+    logger.info(f"Executive summary saved: {summary_path}")
+    return summary_path
+
+
+async def _copy_markdown(final_state: Dict[str, Any], job_dir: Path, job_id: str) -> Optional[Path]:
+    """Copy the annotated markdown into the job directory, if available."""
+    markdown_path = final_state.get("markdown_path")
+    if not markdown_path:
+        return None
+    
+    # Kernel-side copy (sendfile on Linux), without decoding the markdown
+    annotated_path = job_dir / f"annotated_contract_{job_id}.md"
+    try:
+        await asyncio.to_thread(shutil.copyfile, markdown_path, annotated_path)
+    except FileNotFoundError:
+        return None
+    
+    logger.info(f"Annotated contract saved: {annotated_path}")
+    return annotated_path
+
+
+async def save_analysis_outputs(final_state: Dict[str, Any], job_dir: Path, job_id: str) -> Dict[str, Path]:
     """
     Save all outputs from the workflow to files.
+    The outputs are independent, so they are written concurrently and a
+    failure in one does not prevent the others from being saved.
     
     Args:
         final_state: Final state from workflow execution
         job_dir: Directory to save outputs
         job_id: Job identifier for file naming
+        
+    Returns:
+        Dict mapping output name (file stem) to the path written
     """
-    # 1. Save Risk Report JSON
-    risk_summary = final_state.get("contract_risk_summary")
-    risk_report = {
-        "analysis_timestamp": datetime.now().isoformat(),
-        "pdf_path": final_state.get("pdf_path", ""),
-        "overall_risk_score": risk_summary.overall_risk_score if risk_summary else 0,
-        "risk_distribution": {
-            "high": risk_summary.risk_distribution.high if risk_summary else 0,
-            "medium": risk_summary.risk_distribution.medium if risk_summary else 0,
-            "low": risk_summary.risk_distribution.low if risk_summary else 0,
-        } if risk_summary else {},
-        "total_clauses": len(final_state.get("clauses", [])),
-        "high_risk_clauses": sum(1 for r in final_state.get("risk_outputs", []) if r.risk_level.value == "High"),
-        "medium_risk_clauses": sum(1 for r in final_state.get("risk_outputs", []) if r.risk_level.value == "Medium"),
-        "low_risk_clauses": sum(1 for r in final_state.get("risk_outputs", []) if r.risk_level.value == "Low"),
-        "clauses": [
-            {
-                "clause_id": c.clause_id,
-                "heading": c.heading,
-                "page": c.page,
-                "type": final_state["classified_dict"].get(c.clause_id, "Unknown"),
-                "risk_level": final_state["risk_levels_dict"].get(c.clause_id).value if c.clause_id in final_state["risk_levels_dict"] else "Unknown",
-                "risk_score": next((r.risk_score for r in final_state["risk_outputs"] if r.clause_id == c.clause_id), 0)
-            }
-            for c in final_state.get("clauses", [])
-        ],
-        "citations": [
-            {
-                "clause_id": c.clause_id,
-                "found": c.found,
-                "section": c.section,
-                "law_name": c.law_name,
-                "explanation": c.explanation
-            }
-            for c in final_state.get("citations", [])
-        ],
-        "redlines": [
-            {
-                "clause_id": r.clause_id,
-                "original": truncate_to_complete_sentence(r.original_text, 300),
-                "suggested": truncate_to_complete_sentence(r.suggested_text, 400),
-                "rationale": r.rationale
-            }
-            for r in final_state.get("redlines", [])
-        ]
-    }
+    writers = (_write_risk_report, _write_exec_summary, _copy_markdown)
+    results = await asyncio.gather(
+        *(writer(final_state, job_dir, job_id) for writer in writers),
+        return_exceptions=True
+    )
     
-    risk_report_path = job_dir / f"risk_report_{job_id}.json"
-    with open(risk_report_path, 'w', encoding='utf-8') as f:
-        json.dump(risk_report, f, indent=2, ensure_ascii=False)
+    saved = {}
+    for writer, result in zip(writers, results):
+        if isinstance(result, Exception):
+            logger.error(f"{writer.__name__} failed for job {job_id}: {result}")
+        elif result is not None:
+            saved[result.stem] = result
     
-    logger.info(f"Risk report saved: {risk_report_path}")
+    return saved
+
+
+def _load_cached_result(digest: str) -> Optional[AnalysisResult]:
+    """
+    Load the cached analysis of a contract, if its output files still exist.
     
-    # 2. Save Executive Summary Text
-    if final_state.get("executive_summary"):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        summary_agent = create_summary_agent(api_key)
-        summary_text = summary_agent.create_executive_summary_text(
-            final_state["executive_summary"]
-        )
-        
-        summary_path = job_dir / f"executive_summary_{job_id}.txt"
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            f.write(summary_text)
+    Args:
+        digest: SHA-256 hex digest of the PDF
         
-        logger.info(f"Executive summary saved: {summary_path}")
+    Returns:
+        Cached AnalysisResult, or None on a cache miss
+    """
+    cache_path = result_cache_dir / f"{digest}.json.gz"
+    try:
+        result = AnalysisResult(**orjson.loads(gzip.decompress(cache_path.read_bytes())))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Discarding unreadable cached result {cache_path.name}: {e}")
+        cache_path.unlink(missing_ok=True)
+        return None
     
-    # 3. Save annotated markdown if available
-    markdown_path = final_state.get("markdown_path")
-    if markdown_path and Path(markdown_path).exists():
-        with open(markdown_path, 'r', encoding='utf-8') as f:
-            markdown_content = f.read()
-        
-        annotated_path = job_dir / f"annotated_contract_{job_id}.md"
-        with open(annotated_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
-        
-        logger.info(f"Annotated contract saved: {annotated_path}")
+    # The result points at the original job's files
+    for relative_path in result.files.values():
+        path = output_dir / relative_path
+        if not path.exists() and not _gzip_path(path).exists():
+            return None
+    
+    # Mark as recently used for eviction
+    os.utime(cache_path)
+    return result
 
 
-@app.post("/analyze", response_model=AnalysisResult)
-async def analyze_contract(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None
-):
+def _store_cached_result(digest: str, result: AnalysisResult):
     """
-    Analyze a contract PDF
+    Cache an analysis result and evict the least recently used results
+    once the cache exceeds RESULT_CACHE_MAX_BYTES.
     
     Args:
-        file: PDF file to analyze
-        
-    Returns:
-        Analysis results with risk scores, citations, and suggestions
+        digest: SHA-256 hex digest of the PDF
+        result: Analysis result to cache
     """
-    if not workflow:
-        raise HTTPException(status_code=503, detail="Workflow not initialized")
+    cache_path = result_cache_dir / f"{digest}.json.gz"
+    cache_path.write_bytes(gzip.compress(orjson.dumps(result.model_dump(mode="json")), compresslevel=3))
+    
+    entries = sorted(
+        ((entry.stat(), entry) for entry in result_cache_dir.glob("*.json.gz")),
+        key=lambda item: item[0].st_mtime
+    )
+    total_size = sum(stat.st_size for stat, _ in entries)
+    for stat, entry in entries:
+        if total_size <= RESULT_CACHE_MAX_BYTES:
+            break
+        entry.unlink(missing_ok=True)
+        total_size -= stat.st_size
+
+
+async def _save_upload(file: UploadFile) -> tuple:
+    """
+    Validate an uploaded contract and save it into a new job directory.
     
+    Returns:
+        Tuple of (job_id, job_dir, pdf_path, digest) where digest is the
+        PDF's SHA-256 hex digest
+    """
     # Validate file type
-    if not file.filename.endswith('.pdf'):
+    if PurePosixPath(file.filename or '').suffix.lower() != '.pdf':
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
-    # Generate job ID
-    job_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Generate job ID: sortable by start time, unique under concurrent uploads
+    job_id = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
     job_dir = output_dir / job_id
     job_dir.mkdir(exist_ok=True)
     
     # Save uploaded file
     pdf_path = job_dir / file.filename
+    sha256 = hashlib.sha256()
     try:
-        with open(pdf_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        async with aiofiles.open(pdf_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                sha256.update(chunk)
+                await f.write(chunk)
         logger.info(f"Saved uploaded file: {pdf_path}")
     except Exception as e:
         logger.error(f"Failed to save file: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
-    # Run analysis
-    try:
-        logger.info(f"Starting analysis for job {job_id}")
-        result = workflow.execute(str(pdf_path))
-        logger.info(f"Analysis complete for job {job_id}")
-        
-        # Save outputs to job directory
-        save_analysis_outputs(result, job_dir, job_id)
-        logger.info(f"Outputs saved for job {job_id}")
-        
-        # Extract results
-        risk_summary = result.get("contract_risk_summary")
-        if not risk_summary:
-            raise HTTPException(status_code=500, detail="Analysis failed to produce risk summary")
-        
-        # Count items
-        clauses = result.get("clauses", [])
-        citations = result.get("citations", [])
-        redlines = result.get("redlines", [])
-        risk_levels = result.get("risk_levels_dict", {})
-        
-        # Count risk levels properly (handle both enum and string values)
-        high_count = sum(1 for v in risk_levels.values() if (v.value if hasattr(v, 'value') else v) == "High")
-        medium_count = sum(1 for v in risk_levels.values() if (v.value if hasattr(v, 'value') else v) == "Medium")
-        low_count = sum(1 for v in risk_levels.values() if (v.value if hasattr(v, 'value') else v) == "Low")
-        
-        # Get executive summary
-        exec_summary = result.get("executive_summary", "")
-        if hasattr(exec_summary, 'summary_text'):
-            exec_summary_text = exec_summary.summary_text
-        else:
-            exec_summary_text = str(exec_summary)
-        
-        # Extract top risks
-        top_risks = []
-        if hasattr(exec_summary, 'top_risks'):
-            top_risks = exec_summary.top_risks[:5]
-        
-        # Find output files
-        files = {}
-        for f in job_dir.glob("*"):
-            if f.is_file() and f.name != file.filename:
-                files[f.stem] = str(f.relative_to(output_dir))
+    return job_id, job_dir, pdf_path, sha256.hexdigest()
+
+
+async def _run_analysis(
+    pdf_path: Path,
+    job_dir: Path,
+    job_id: str,
+    digest: str,
+    on_progress: Callable[[str], None] = None
+) -> AnalysisResult:
+    """
+    Run the workflow on a saved contract and save its outputs.
+    A contract analyzed before is answered from the result cache, with the
+    original job's ID and files.
+    
+    Args:
+        pdf_path: Path to the uploaded PDF
+        job_dir: Directory to save outputs
+        job_id: Job identifier
+        digest: SHA-256 hex digest of the PDF
+        on_progress: Optional callback receiving each completed workflow stage
+            (called from the worker thread)
         
-        # Convert risk distribution to dict
-        risk_dist_dict = {
-            "high": risk_summary.risk_distribution.high,
-            "medium": risk_summary.risk_distribution.medium,
-            "low": risk_summary.risk_distribution.low
-        }
+    Returns:
+        Analysis results
+    """
+    cached = await asyncio.to_thread(_load_cached_result, digest)
+    if cached is not None:
+        logger.info(f"Job {job_id}: contract already analyzed in job {cached.job_id}")
+        if cached.job_id != job_id:
+            await asyncio.to_thread(shutil.rmtree, job_dir, True)
+        return cached
+    
+    logger.info(f"Starting analysis for job {job_id}")
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        executor,
+        partial(workflow.execute, str(pdf_path), thread_id=job_id, on_progress=on_progress)
+    )
+    logger.info(f"Analysis complete for job {job_id}")
+    
+    # Save outputs to job directory
+    saved = await save_analysis_outputs(result, job_dir, job_id)
+    logger.info(f"Outputs saved for job {job_id}")
+    
+    # Extract results
+    risk_summary = result.get("contract_risk_summary")
+    if not risk_summary:
+        raise HTTPException(status_code=500, detail="Analysis failed to produce risk summary")
+    
+    # Count items
+    clauses = result.get("clauses", [])
+    citations = result.get("citations", [])
+    redlines = result.get("redlines", [])
+    risk_levels = result.get("risk_levels_dict", {})
+    
+    # Count risk levels properly (handle both enum and string values)
+    level_counts = Counter(getattr(v, 'value', v) for v in risk_levels.values())
+    
+    # Get executive summary
+    exec_summary = result.get("executive_summary", "")
+    if hasattr(exec_summary, 'summary_text'):
+        exec_summary_text = exec_summary.summary_text
+    else:
+        exec_summary_text = str(exec_summary)
+    
+    # Extract top risks
+    top_risks = []
+    if hasattr(exec_summary, 'top_risks'):
+        top_risks = exec_summary.top_risks[:5]
+    
+    # Output files, as written by save_analysis_outputs
+    files = {name: str(path.relative_to(output_dir)) for name, path in saved.items()}
+    
+    # Convert risk distribution to dict
+    risk_dist_dict = {
+        "high": risk_summary.risk_distribution.high,
+        "medium": risk_summary.risk_distribution.medium,
+        "low": risk_summary.risk_distribution.low
+    }
+    
+    analysis = AnalysisResult(
+        job_id=job_id,
+        overall_risk_score=risk_summary.overall_risk_score,
+        risk_distribution=risk_dist_dict,
+        total_clauses=len(clauses),
+        high_risk_count=level_counts["High"],
+        medium_risk_count=level_counts["Medium"],
+        low_risk_count=level_counts["Low"],
+        citations_found=len(citations),
+        redlines_generated=len(redlines),
+        executive_summary=exec_summary_text,
+        top_risks=top_risks,
+        files=files
+    )
+    
+    # Only complete runs are reused; a partial one (e.g. legal retrieval hit
+    # a rate limit) should be retried on the next upload
+    if result.get("error"):
+        logger.warning(f"Not caching result for job {job_id}, workflow reported: {result['error']}")
+    else:
+        try:
+            await asyncio.to_thread(_store_cached_result, digest, analysis)
+        except Exception as e:
+            logger.warning(f"Failed to cache result for job {job_id}: {e}")
+    
+    return analysis
+
+
+@app.post("/analyze", response_model=AnalysisResult)
+async def analyze_contract(
+    file: UploadFile = File(...),
+    background_tasks: BackgroundTasks = None
+):
+    """
+    Analyze a contract PDF
+    
+    Args:
+        file: PDF file to analyze
         
-        return AnalysisResult(
-            job_id=job_id,
-            overall_risk_score=risk_summary.overall_risk_score,
-            risk_distribution=risk_dist_dict,
-            total_clauses=len(clauses),
-            high_risk_count=high_count,
-            medium_risk_count=medium_count,
-            low_risk_count=low_count,
-            citations_found=len(citations),
-            redlines_generated=len(redlines),
-            executive_summary=exec_summary_text,
-            top_risks=top_risks,
-            files=files
-        )
+    Returns:
+        Analysis results with risk scores, citations, and suggestions
+    """
+    if not workflow:
+        raise HTTPException(status_code=503, detail="Workflow not initialized")
+    
+    job_id, job_dir, pdf_path, digest = await _save_upload(file)
+    
+    # Run analysis
+    try:
+        return await _run_analysis(pdf_path, job_dir, job_id, digest)
         
     except Exception as e:
         logger.error(f"Analysis failed for job {job_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+async def _run_analysis_job(pdf_path: Path, job_dir: Path, job_id: str, digest: str, events: asyncio.Queue):
+    """Run a background analysis job, publishing its progress to the job's event queue."""
+    loop = asyncio.get_running_loop()
+    
+    def on_progress(stage: str):
+        loop.call_soon_threadsafe(events.put_nowait, {"stage": stage})
+    
+    try:
+        result = await _run_analysis(pdf_path, job_dir, job_id, digest, on_progress=on_progress)
+        events.put_nowait({"stage": "completed", "result": result.model_dump(mode="json")})
+    except Exception as e:
+        logger.error(f"Analysis failed for job {job_id}: {e}")
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        events.put_nowait({"stage": "failed", "error": f"Analysis failed: {detail}"})
+    finally:
+        # Drop events nobody came to read
+        loop.call_later(JOB_EVENTS_TTL, _job_events.pop, job_id, None)
+
+
+@app.post("/analyze/jobs", response_model=AnalysisStatus, status_code=202)
+async def submit_analysis(file: UploadFile = File(...)):
+    """
+    Start analyzing a contract PDF in the background.
+    Progress and the final result are streamed from
+    GET /analyze/{job_id}/events.
+    
+    Args:
+        file: PDF file to analyze
+        
+    Returns:
+        Accepted job status with the job ID
+    """
+    if not workflow:
+        raise HTTPException(status_code=503, detail="Workflow not initialized")
+    
+    job_id, job_dir, pdf_path, digest = await _save_upload(file)
+    
+    events = asyncio.Queue()
+    _job_events[job_id] = events
+    task = asyncio.create_task(_run_analysis_job(pdf_path, job_dir, job_id, digest, events))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    
+    return AnalysisStatus(
+        status="accepted",
+        message="Analysis started",
+        job_id=job_id
+    )
+
+
+@app.get("/analyze/{job_id}/events")
+async def stream_analysis_events(job_id: str):
+    """
+    Stream a background job's progress as Server-Sent Events.
+    Each workflow stage is sent as it completes; the stream ends with a
+    "completed" event carrying the analysis result or a "failed" event.
+    """
+    events = _job_events.get(job_id)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        while True:
+            event = await events.get()
+            yield f"data: {orjson.dumps(event).decode()}\n\n"
+            if event["stage"] in ("completed", "failed"):
+                _job_events.pop(job_id, None)
+                break
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/download/{job_id}/{filename}")
-async def download_file(job_id: str, filename: str):
-    """Download analysis output file"""
+async def download_file(job_id: str, filename: str, request: Request, pretty: bool = False):
+    """
+    Download analysis output file.
+    Outputs stored gzip-compressed are sent with Content-Encoding: gzip when
+    the client accepts it, and decompressed otherwise or when ?pretty=1
+    asks for indented JSON.
+    """
     file_path = output_dir / job_id / filename
+    gz_path = _gzip_path(file_path)
+    
+    if not file_path.exists() and gz_path.exists():
+        headers = {
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding"
+        }
+        
+        if pretty or "gzip" not in request.headers.get("accept-encoding", ""):
+            async with aiofiles.open(gz_path, 'rb') as f:
+                content = gzip.decompress(await f.read())
+            if pretty:
+                content = orjson.dumps(orjson.loads(content), option=orjson.OPT_INDENT_2)
+            return Response(content=content, media_type='application/json', headers=headers)
+        
+        return FileResponse(
+            path=str(gz_path),
+            media_type='application/json',
+            headers={**headers, "Content-Encoding": "gzip"}
+        )
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
@@ -362,7 +595,8 @@ async def download_file(job_id: str, filename: str):
     return FileResponse(
         path=str(file_path),
         filename=filename,
-        media_type='application/octet-stream'
+        media_type=DOWNLOAD_MEDIA_TYPES.get(file_path.suffix.lower(), 'application/octet-stream'),
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
     )
 
 
@@ -374,7 +608,7 @@ async def get_job_info(job_id: str):
     if not job_dir.exists():
         raise HTTPException(status_code=404, detail="Job not found")
     
-    files = [f.name for f in job_dir.glob("*") if f.is_file()]
+    files = [f.name.removesuffix(".gz") for f in job_dir.glob("*") if f.is_file()]
     
     return {
         "job_id": job_id,
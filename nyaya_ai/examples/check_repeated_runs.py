@@ -0,0 +1,87 @@
+"""
+Check that one process can run the workflow repeatedly.
+
+Each workflow.execute runs on its own event loop (and the API runs several
+at once on worker threads), so the shared LLM clients must not be bound to
+the first loop they ran on.
+
+Usage:
+    python examples/check_repeated_runs.py path/to/contract.pdf
+"""
+
+import os
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Persisted LLM responses would let later runs skip the client entirely
+os.environ.pop("NYAYA_CACHE_DB", None)
+
+from orchestrator.workflow import create_workflow
+from utils.llm_helper import get_llm
+
+
+def check_loop_local_clients(api_key: str):
+    """Each event loop gets its own client; calls on one loop share it."""
+    llm = get_llm("gemini-2.5-flash", 0.1, api_key)
+
+    async def client_pair():
+        return llm.client(), llm.client()
+
+    first_a, first_b = asyncio.run(client_pair())
+    second_a, _ = asyncio.run(client_pair())
+
+    assert first_a is first_b, "calls on one loop should share a client"
+    assert first_a is not second_a, "a new loop should get a new client"
+    print("✓ LLM clients are per event loop")
+
+
+def run_once(api_key: str, pdf_path: str, output_dir: str, label: str):
+    """Run a fresh workflow (with empty in-memory caches) and fail on errors."""
+    workflow = create_workflow(api_key=api_key, config={"output_dir": output_dir})
+    result = workflow.execute(pdf_path)
+
+    if result.get("error"):
+        raise RuntimeError(f"{label} failed: {result['error']}")
+
+    print(f"✓ {label} completed (stage: {result.get('stage')})")
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment")
+
+    pdf_path = sys.argv[1]
+    output_dir = "output/check_repeated_runs"
+
+    check_loop_local_clients(api_key)
+
+    # Back to back: the second run gets a new event loop
+    run_once(api_key, pdf_path, output_dir, "Run 1")
+    run_once(api_key, pdf_path, output_dir, "Run 2")
+
+    # Concurrently, as the API does with NYAYA_API_WORKERS > 1
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(run_once, api_key, pdf_path, output_dir, f"Concurrent run {i}")
+            for i in (1, 2)
+        ]
+        for future in futures:
+            future.result()
+
+    print("\n✓ Repeated workflow runs share the process without loop errors")
+
+
+if __name__ == "__main__":
+    main()
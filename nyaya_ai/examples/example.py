@@ -12,7 +12,6 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from orchestrator.workflow import create_workflow
-from agents.summary_agent import create_summary_agent
 
 
 def analyze_contract(pdf_path: str, output_dir: str = "output"):
@@ -49,8 +48,7 @@ def analyze_contract(pdf_path: str, output_dir: str = "output"):
         
         # Generate executive summary text
         if result.get("executive_summary"):
-            summary_agent = create_summary_agent(api_key)
-            text = summary_agent.create_executive_summary_text(result["executive_summary"])
+            text = workflow.summary_agent.create_executive_summary_text(result["executive_summary"])
             print("\n" + "="*80)
             print(text)
     
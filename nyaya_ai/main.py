@@ -3,12 +3,12 @@ Main Entry Point for NyayaAI System.
 Production-grade multi-agent legal contract analysis.
 
 Usage:
-    python main.py --pdf path/to/contract.pdf [--output output_dir]
+    python main.py --pdf path/to/contract.pdf [--output output_dir] [--batch-size N]
 """
 
 import os
 import sys
-import json
+import orjson
 import logging
 import argparse
 from pathlib import Path
@@ -17,7 +17,7 @@ from typing import Optional
 from dotenv import load_dotenv
 
 from orchestrator.workflow import create_workflow
-from agents.summary_agent import create_summary_agent
+from utils.report_builder import build_risk_report
 
 # Load environment variables
 load_dotenv()
@@ -45,74 +45,32 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     )
 
 
-def save_outputs(final_state, output_dir: Path):
+def save_outputs(final_state, output_dir: Path, summary_agent):
     """
     Save all outputs from the workflow.
     
     Args:
         final_state: Final state from workflow execution
         output_dir: Directory to save outputs
+        summary_agent: SummaryAgent used to format the executive summary
     """
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Generate timestamp for file naming
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    analysis_time = datetime.now()
+    timestamp = analysis_time.strftime("%Y%m%d_%H%M%S")
     
     # 1. Save Risk Report JSON
-    risk_report = {
-        "analysis_timestamp": datetime.now().isoformat(),
-        "pdf_path": final_state.get("pdf_path", ""),
-        "overall_risk_score": final_state["contract_risk_summary"].overall_risk_score if final_state["contract_risk_summary"] else 0,
-        "risk_distribution": {
-            "high": final_state["contract_risk_summary"].risk_distribution.high if final_state["contract_risk_summary"] else 0,
-            "medium": final_state["contract_risk_summary"].risk_distribution.medium if final_state["contract_risk_summary"] else 0,
-            "low": final_state["contract_risk_summary"].risk_distribution.low if final_state["contract_risk_summary"] else 0,
-        } if final_state["contract_risk_summary"] else {},
-        "total_clauses": len(final_state.get("clauses", [])),
-        "high_risk_clauses": sum(1 for r in final_state.get("risk_outputs", []) if r.risk_level.value == "High"),
-        "medium_risk_clauses": sum(1 for r in final_state.get("risk_outputs", []) if r.risk_level.value == "Medium"),
-        "low_risk_clauses": sum(1 for r in final_state.get("risk_outputs", []) if r.risk_level.value == "Low"),
-        "clauses": [
-            {
-                "clause_id": c.clause_id,
-                "heading": c.heading,
-                "page": c.page,
-                "type": final_state["classified_dict"].get(c.clause_id, "Unknown"),
-                "risk_level": final_state["risk_levels_dict"].get(c.clause_id).value if c.clause_id in final_state["risk_levels_dict"] else "Unknown",
-                "risk_score": next((r.risk_score for r in final_state["risk_outputs"] if r.clause_id == c.clause_id), 0)
-            }
-            for c in final_state.get("clauses", [])
-        ],
-        "citations": [
-            {
-                "clause_id": c.clause_id,
-                "found": c.found,
-                "section": c.section,
-                "law_name": c.law_name,
-                "explanation": c.explanation
-            }
-            for c in final_state.get("citations", [])
-        ],
-        "redlines": [
-            {
-                "clause_id": r.clause_id,
-                "original": r.original_text[:200] + "...",
-                "suggested": r.suggested_text[:200] + "...",
-                "rationale": r.rationale
-            }
-            for r in final_state.get("redlines", [])
-        ]
-    }
+    risk_report = build_risk_report(final_state, analysis_time)
     
     risk_report_path = output_dir / f"risk_report_{timestamp}.json"
-    with open(risk_report_path, 'w', encoding='utf-8') as f:
-        json.dump(risk_report, f, indent=2, ensure_ascii=False)
+    with open(risk_report_path, 'wb') as f:
+        f.write(orjson.dumps(risk_report, option=orjson.OPT_INDENT_2))
     
     print(f"\n✓ Risk Report saved: {risk_report_path}")
     
     # 2. Save Executive Summary Text
     if final_state.get("executive_summary"):
-        summary_agent = create_summary_agent(os.getenv("GOOGLE_API_KEY"))
         summary_text = summary_agent.create_executive_summary_text(
             final_state["executive_summary"]
         )
@@ -149,6 +107,12 @@ def main():
         default="output",
         help="Output directory for results (default: output)"
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Clauses per LLM request for classification and risk detection (default: 1)"
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -196,7 +160,7 @@ def main():
         logger.info("Initializing NyayaAI workflow...")
         workflow = create_workflow(
             api_key=api_key,
-            config={"output_dir": args.output}
+            config={"output_dir": args.output, "batch_size": args.batch_size}
         )
         
         # Execute workflow
@@ -210,7 +174,7 @@ def main():
         else:
             # Save outputs
             output_dir = Path(args.output)
-            save_outputs(final_state, output_dir)
+            save_outputs(final_state, output_dir, workflow.summary_agent)
             
             # Print summary
             if final_state.get("contract_risk_summary"):
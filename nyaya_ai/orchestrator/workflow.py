@@ -4,29 +4,58 @@ MANDATORY: Coordinates all agents using LangGraph.
 Handles state management, error recovery, and async execution.
 """
 
+import uuid
 import logging
 import asyncio
-from typing import Dict, Any, TypedDict, Annotated
+from contextlib import asynccontextmanager
+from collections import Counter
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, TypedDict, Annotated, AsyncIterator, Callable, Optional
 from pathlib import Path
 
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
+try:
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:  # Optional: only needed for persistent checkpoints
+    AsyncSqliteSaver = None
+
 from schemas.models import (
     Clause, ClassifiedClause, RiskOutput, Citation, 
-    Redline, ContractRiskSummary, ExecutiveSummary, RiskLevel
+    Redline, ContractRiskSummary, ExecutiveSummary, RiskLevel,
+    ScoringBreakdown
 )
 from pdf_to_markdown import convert_pdf_to_markdown
-from agents.clause_classifier import create_classifier_agent
-from agents.risk_detector import create_risk_detector_agent
-from agents.legal_retriever import create_legal_retriever_agent
-from agents.redline_generator import create_redline_generator_agent
-from agents.summary_agent import create_summary_agent
 from risk_engine import compute_contract_score
+from utils.async_helper import run_sync
 
 logger = logging.getLogger(__name__)
 
 
+def _merge_errors(current: str | None, new: str | None) -> str | None:
+    """Combine error messages written by parallel branches."""
+    if not new or new == current:
+        return current
+    if not current:
+        return new
+    return f"{current}; {new}"
+
+
+def _latest(current: str, new: str) -> str:
+    """Keep the most recently written value."""
+    return new
+
+
+@dataclass(slots=True, frozen=True)
+class ClauseScore:
+    """Lightweight stand-in for ClauseRiskScore used when scoring the contract."""
+    clause_id: str
+    final_risk_score: int
+    scoring_breakdown: ScoringBreakdown
+
+
 class WorkflowState(TypedDict):
     """State for the LangGraph workflow."""
     pdf_path: str
@@ -41,8 +70,9 @@ class WorkflowState(TypedDict):
     redlines: list[Redline]
     contract_risk_summary: ContractRiskSummary | None
     executive_summary: ExecutiveSummary | None
-    error: str | None
-    stage: str
+    # Reducers allow the parallel branches to both report errors and progress
+    error: Annotated[str | None, _merge_errors]
+    stage: Annotated[str, _latest]
 
 
 class NyayaAIWorkflow:
@@ -51,16 +81,53 @@ class NyayaAIWorkflow:
     Coordinates all agents in the correct sequence.
     """
     
+    # Empty state every run starts from. Nodes replace keys rather than
+    # mutating these values in place, so a shallow copy per run is enough.
+    _INITIAL_STATE_TEMPLATE = MappingProxyType({
+        "pdf_path": "",
+        "markdown_path": "",
+        "clauses": [],
+        "classified": [],
+        "classified_dict": {},
+        "risk_outputs": [],
+        "risk_levels_dict": {},
+        "citations": [],
+        "citations_dict": {},
+        "redlines": [],
+        "contract_risk_summary": None,
+        "executive_summary": None,
+        "error": None,
+        "stage": "initialized"
+    })
+    
     def __init__(self, api_key: str, config: Dict[str, Any] = None):
         """
         Initialize the NyayaAI workflow.
         
         Args:
             api_key: OpenAI API key
-            config: Optional configuration dictionary
+            config: Optional configuration dictionary. Set "checkpoint" to
+                True to keep per-thread state snapshots in memory; runs are
+                not checkpointed by default. Set "checkpoint_db" to a SQLite
+                file to persist checkpoints across runs instead (requires
+                langgraph-checkpoint-sqlite). Set "batch_size" above 1 to
+                classify and risk-score that many clauses per LLM request.
         """
         self.api_key = api_key
         self.config = config or {}
+        self.batch_size = max(1, int(self.config.get("batch_size", 1)))
+        self.checkpoint_db = self.config.get("checkpoint_db")
+        
+        if self.checkpoint_db and AsyncSqliteSaver is None:
+            raise ImportError("checkpoint_db requires the langgraph-checkpoint-sqlite package")
+        
+        # Agent modules pull in the LLM client stack, so they are imported
+        # only when a workflow is actually built
+        from agents.clause_classifier import create_classifier_agent
+        from agents.risk_detector import create_risk_detector_agent
+        from agents.legal_retriever import create_legal_retriever_agent
+        from agents.redline_generator import create_redline_generator_agent
+        from agents.summary_agent import create_summary_agent
         
         # Initialize agents
         self.classifier_agent = create_classifier_agent(api_key)
@@ -71,7 +138,8 @@ class NyayaAIWorkflow:
         
         # Build graph
         self.workflow = self._build_workflow()
-        self.app = self.workflow.compile(checkpointer=MemorySaver())
+        checkpointer = MemorySaver() if self.config.get("checkpoint", False) else None
+        self.app = self.workflow.compile(checkpointer=checkpointer)
         
         logger.info("NyayaAI Workflow initialized with all agents")
     
@@ -91,20 +159,43 @@ class NyayaAIWorkflow:
         workflow.add_node("retrieve_legal", self._retrieve_legal_node)
         workflow.add_node("generate_redlines", self._generate_redlines_node)
         workflow.add_node("generate_summary", self._generate_summary_node)
+        workflow.add_node("complete", self._complete_node)
         
-        # Define edges (sequential flow)
+        # Define edges. The summary only needs risk scores, so it runs
+        # alongside the citation -> redline branch once risks are detected.
+        # Every step that later steps depend on stops the run on error.
         workflow.set_entry_point("pdf_to_markdown")
-        workflow.add_edge("pdf_to_markdown", "classify_clauses")
-        workflow.add_edge("classify_clauses", "detect_risks")
-        workflow.add_edge("detect_risks", "retrieve_legal")
-        workflow.add_edge("retrieve_legal", "generate_redlines")
-        workflow.add_edge("generate_redlines", "generate_summary")
-        workflow.add_edge("generate_summary", END)
+        self._add_edge_unless_error(workflow, "pdf_to_markdown", "classify_clauses")
+        self._add_edge_unless_error(workflow, "classify_clauses", "detect_risks")
+        self._add_edge_unless_error(workflow, "detect_risks", "retrieve_legal")
+        self._add_edge_unless_error(workflow, "retrieve_legal", "generate_redlines")
+        self._add_edge_unless_error(workflow, "detect_risks", "generate_summary")
+        workflow.add_edge(["generate_redlines", "generate_summary"], "complete")
+        workflow.add_edge("complete", END)
         
         logger.info("Workflow graph built successfully")
         
         return workflow
     
+    @staticmethod
+    def _add_edge_unless_error(workflow: StateGraph, source: str, target: str) -> None:
+        """
+        Add an edge from source to target that ends the run instead when
+        the state carries an error, so later agents are not called on a
+        failed analysis.
+        
+        Args:
+            workflow: Graph being built
+            source: Node the edge starts from
+            target: Node to run next when there is no error
+        """
+        def route(state: WorkflowState) -> str:
+            return END if state.get("error") else target
+        
+        # Branches from one source are keyed by function name
+        route.__name__ = f"continue_to_{target}"
+        workflow.add_conditional_edges(source, route, {target: target, END: END})
+    
     def _pdf_to_markdown_node(self, state: WorkflowState) -> WorkflowState:
         """
         Node 1: Convert PDF to Markdown.
@@ -129,14 +220,19 @@ class NyayaAIWorkflow:
         
         return state
     
-    def _classify_clauses_node(self, state: WorkflowState) -> WorkflowState:
+    async def _classify_clauses_node(self, state: WorkflowState) -> WorkflowState:
         """
         Node 2: Classify all clauses.
         """
         logger.info(f"[2/6] Clause Classification: Processing {len(state['clauses'])} clauses")
         
         try:
-            classified = self.classifier_agent.classify_clauses(state["clauses"])
+            if self.batch_size > 1:
+                classified = await self.classifier_agent.aclassify_clauses_batched(
+                    state["clauses"], self.batch_size
+                )
+            else:
+                classified = await self.classifier_agent.aclassify_clauses(state["clauses"])
             
             # Create lookup dictionary
             classified_dict = {
@@ -156,36 +252,36 @@ class NyayaAIWorkflow:
         
         return state
     
-    def _detect_risks_node(self, state: WorkflowState) -> WorkflowState:
+    async def _detect_risks_node(self, state: WorkflowState) -> WorkflowState:
         """
         Node 3: Detect and score risks.
         """
         logger.info(f"[3/6] Risk Detection: Analyzing {len(state['clauses'])} clauses")
         
         try:
-            risk_outputs, updated_markdown = self.risk_detector_agent.process_all_clauses(
+            risk_outputs, updated_markdown = await self.risk_detector_agent.aprocess_all_clauses(
                 state["clauses"],
                 state["classified_dict"],
-                state["markdown_path"]
+                state["markdown_path"],
+                batch_size=self.batch_size
             )
             
-            # Create lookup dictionary
-            risk_levels_dict = {
-                r.clause_id: r.risk_level 
-                for r in risk_outputs
-            }
+            # Create lookup dictionary and count risks in one pass
+            risk_levels_dict = {}
+            risk_counts = Counter()
+            for r in risk_outputs:
+                risk_levels_dict[r.clause_id] = r.risk_level
+                risk_counts[r.risk_level] += 1
             
             state["risk_outputs"] = risk_outputs
             state["risk_levels_dict"] = risk_levels_dict
             state["markdown_path"] = updated_markdown
             state["stage"] = "risks_detected"
             
-            # Count risks
-            high = sum(1 for r in risk_outputs if r.risk_level == RiskLevel.HIGH)
-            medium = sum(1 for r in risk_outputs if r.risk_level == RiskLevel.MEDIUM)
-            low = sum(1 for r in risk_outputs if r.risk_level == RiskLevel.LOW)
-            
-            logger.info(f"✓ Risk detection complete: High={high}, Medium={medium}, Low={low}")
+            logger.info(
+                f"✓ Risk detection complete: High={risk_counts[RiskLevel.HIGH]}, "
+                f"Medium={risk_counts[RiskLevel.MEDIUM]}, Low={risk_counts[RiskLevel.LOW]}"
+            )
             
         except Exception as e:
             logger.error(f"✗ Error in Risk Detection: {e}")
@@ -193,47 +289,51 @@ class NyayaAIWorkflow:
         
         return state
     
-    def _retrieve_legal_node(self, state: WorkflowState) -> WorkflowState:
+    async def _retrieve_legal_node(self, state: WorkflowState) -> dict:
         """
         Node 4: Retrieve legal citations.
+        Runs in parallel with summary generation, so it returns only the
+        keys it updates.
         """
         logger.info(f"[4/6] Legal Retrieval: Finding citations")
         
+        update = {}
+        
         try:
-            citations, updated_markdown = self.legal_retriever_agent.process_risk_tagged_markdown(
+            citations, updated_markdown = await self.legal_retriever_agent.aprocess_risk_tagged_markdown(
                 state["markdown_path"],
                 state["clauses"],
                 state["risk_levels_dict"]
             )
             
-            # Create lookup dictionary
-            citations_dict = {
-                c.clause_id: c 
-                for c in citations
-            }
+            # Create lookup dictionary and count hits in one pass
+            citations_dict = {}
+            found = 0
+            for c in citations:
+                citations_dict[c.clause_id] = c
+                found += c.found
             
-            state["citations"] = citations
-            state["citations_dict"] = citations_dict
-            state["markdown_path"] = updated_markdown
-            state["stage"] = "citations_retrieved"
+            update["citations"] = citations
+            update["citations_dict"] = citations_dict
+            update["markdown_path"] = updated_markdown
+            update["stage"] = "citations_retrieved"
             
-            found = sum(1 for c in citations if c.found)
             logger.info(f"✓ Legal retrieval complete: Found {found}/{len(citations)} citations")
             
         except Exception as e:
             logger.error(f"✗ Error in Legal Retrieval: {e}")
-            state["error"] = f"Legal retrieval failed: {str(e)}"
+            update["error"] = f"Legal retrieval failed: {str(e)}"
         
-        return state
+        return update
     
-    def _generate_redlines_node(self, state: WorkflowState) -> WorkflowState:
+    async def _generate_redlines_node(self, state: WorkflowState) -> WorkflowState:
         """
         Node 5: Generate redline suggestions.
         """
         logger.info(f"[5/6] Redline Generation: Creating suggestions")
         
         try:
-            redlines, updated_markdown = self.redline_agent.process_cited_markdown(
+            redlines, updated_markdown = await self.redline_agent.aprocess_cited_markdown(
                 state["markdown_path"],
                 state["clauses"],
                 state["risk_levels_dict"],
@@ -252,21 +352,20 @@ class NyayaAIWorkflow:
         
         return state
     
-    def _generate_summary_node(self, state: WorkflowState) -> WorkflowState:
+    async def _generate_summary_node(self, state: WorkflowState) -> dict:
         """
         Node 6: Generate executive summary.
+        Runs in parallel with legal retrieval, so it returns only the keys
+        it updates.
         """
         logger.info(f"[6/6] Summary Generation: Creating executive summary")
         
+        update = {}
+        
         try:
             # Compute contract-level risk score
-            clause_scores = [r.scoring_breakdown for r in state["risk_outputs"]]
             clause_scores_list = [
-                type('ClauseScore', (), {
-                    'clause_id': r.clause_id,
-                    'final_risk_score': r.risk_score,
-                    'scoring_breakdown': r.scoring_breakdown
-                })()
+                ClauseScore(r.clause_id, r.risk_score, r.scoring_breakdown)
                 for r in state["risk_outputs"]
             ]
             
@@ -276,7 +375,7 @@ class NyayaAIWorkflow:
             )
             
             # Generate executive summary
-            executive_summary = self.summary_agent.generate_summary(
+            executive_summary = await self.summary_agent.agenerate_summary(
                 state["clauses"],
                 state["risk_levels_dict"],
                 clause_scores_list,
@@ -284,28 +383,82 @@ class NyayaAIWorkflow:
                 contract_risk
             )
             
-            state["contract_risk_summary"] = contract_risk
-            state["executive_summary"] = executive_summary
-            state["stage"] = "completed"
+            update["contract_risk_summary"] = contract_risk
+            update["executive_summary"] = executive_summary
+            update["stage"] = "summary_generated"
             
             logger.info(
-                f"✓ Analysis complete! Overall Risk Score: "
+                f"✓ Executive summary ready. Overall Risk Score: "
                 f"{contract_risk.overall_risk_score}/100"
             )
             
         except Exception as e:
             logger.error(f"✗ Error in Summary Generation: {e}")
-            state["error"] = f"Summary generation failed: {str(e)}"
+            update["error"] = f"Summary generation failed: {str(e)}"
         
-        return state
+        return update
+    
+    def _complete_node(self, state: WorkflowState) -> dict:
+        """
+        Join point: runs once both the redline and summary branches finish.
+        """
+        logger.info("✓ Analysis complete!")
+        
+        return {"stage": "completed"}
+    
+    @asynccontextmanager
+    async def _checkpointed_app(self):
+        """
+        Yield the compiled graph to run, bound to a SQLite checkpointer when
+        checkpoint_db is configured. The aiosqlite connection belongs to the
+        running event loop, so it is opened (and the graph compiled) per run.
+        """
+        if not self.checkpoint_db:
+            yield self.app
+            return
+        
+        Path(self.checkpoint_db).parent.mkdir(parents=True, exist_ok=True)
+        async with AsyncSqliteSaver.from_conn_string(self.checkpoint_db) as saver:
+            # WAL (set by the saver) plus NORMAL sync avoids an fsync per write
+            await saver.conn.execute("PRAGMA synchronous=NORMAL")
+            yield self.workflow.compile(checkpointer=saver)
     
-    def execute(self, pdf_path: str, thread_id: str = "default") -> WorkflowState:
+    def execute(
+        self,
+        pdf_path: str,
+        thread_id: Optional[str] = None,
+        on_progress: Callable[[str], None] = None
+    ) -> WorkflowState:
         """
         Execute the complete workflow.
         
         Args:
             pdf_path: Path to the PDF contract
-            thread_id: Thread ID for checkpointing
+            thread_id: Thread ID for checkpointing (when enabled; default: a new
+                thread per run, so no state carries over from earlier runs)
+            on_progress: Optional callback receiving each node name as it completes
+            
+        Returns:
+            Final workflow state
+        """
+        return run_sync(self.aexecute(pdf_path, thread_id=thread_id, on_progress=on_progress))
+    
+    async def aexecute(
+        self,
+        pdf_path: str,
+        thread_id: Optional[str] = None,
+        on_progress: Callable[[str], None] = None
+    ) -> WorkflowState:
+        """
+        Execute the complete workflow asynchronously.
+        The agent nodes await their LLM calls, so each stage's per-clause
+        requests run concurrently on the event loop.
+        
+        Args:
+            pdf_path: Path to the PDF contract
+            thread_id: Thread ID for checkpointing (when enabled; default: a new
+                thread per run, so no state carries over from earlier runs)
+            on_progress: Optional callback receiving each node name as it completes
             
         Returns:
             Final workflow state
@@ -315,27 +468,26 @@ class NyayaAIWorkflow:
         logger.info("=" * 80)
         
         # Initialize state
-        initial_state: WorkflowState = {
-            "pdf_path": pdf_path,
-            "markdown_path": "",
-            "clauses": [],
-            "classified": [],
-            "classified_dict": {},
-            "risk_outputs": [],
-            "risk_levels_dict": {},
-            "citations": [],
-            "citations_dict": {},
-            "redlines": [],
-            "contract_risk_summary": None,
-            "executive_summary": None,
-            "error": None,
-            "stage": "initialized"
-        }
+        initial_state: WorkflowState = {**self._INITIAL_STATE_TEMPLATE, "pdf_path": pdf_path}
         
         # Execute workflow
         try:
-            config = {"configurable": {"thread_id": thread_id}}
-            final_state = self.app.invoke(initial_state, config)
+            config = {"configurable": {"thread_id": thread_id or uuid.uuid4().hex}}
+            async with self._checkpointed_app() as app:
+                if on_progress is None:
+                    final_state = await app.ainvoke(initial_state, config)
+                else:
+                    # Take the final state from the stream itself so progress
+                    # reporting does not depend on a checkpointer
+                    final_state = initial_state
+                    async for mode, chunk in app.astream(
+                        initial_state, config, stream_mode=["updates", "values"]
+                    ):
+                        if mode == "values":
+                            final_state = chunk
+                        else:
+                            for node in chunk:
+                                on_progress(node)
             
             if final_state.get("error"):
                 logger.error(f"Workflow completed with errors: {final_state['error']}")
@@ -351,6 +503,33 @@ class NyayaAIWorkflow:
             initial_state["error"] = f"Workflow execution failed: {str(e)}"
             return initial_state
 
+    
+    async def execute_stream(
+        self,
+        pdf_path: str,
+        thread_id: Optional[str] = None
+    ) -> AsyncIterator[WorkflowState]:
+        """
+        Execute the workflow, yielding the full state after each step.
+        Lets callers render partial results (e.g. classified clauses)
+        before later stages finish; read chunk["stage"] to see which step
+        produced it. The last chunk is the final state.
+        
+        Args:
+            pdf_path: Path to the PDF contract
+            thread_id: Thread ID for checkpointing (when enabled; default: a new
+                thread per run, so no state carries over from earlier runs)
+            
+        Yields:
+            Workflow state snapshots
+        """
+        initial_state: WorkflowState = {**self._INITIAL_STATE_TEMPLATE, "pdf_path": pdf_path}
+        config = {"configurable": {"thread_id": thread_id or uuid.uuid4().hex}}
+        
+        async with self._checkpointed_app() as app:
+            async for state in app.astream(initial_state, config, stream_mode="values"):
+                yield state
+
 
 def create_workflow(api_key: str, config: Dict[str, Any] = None) -> NyayaAIWorkflow:
     """
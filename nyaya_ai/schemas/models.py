@@ -3,6 +3,7 @@ Pydantic models for NyayaAI system.
 Defines all data schemas used across the application.
 """
 
+from functools import cached_property
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 from enum import Enum
@@ -38,6 +39,11 @@ class Clause(BaseModel):
     heading: str = Field(..., description="Clause heading or title")
     content: str = Field(..., description="Full text content of the clause")
     page: int = Field(..., description="Page number where clause appears")
+    
+    @cached_property
+    def content_preview(self) -> str:
+        """First 1000 characters of the content, as sent to the LLM agents."""
+        return self.content[:1000]
 
 
 class ClassifiedClause(BaseModel):
@@ -0,0 +1,78 @@
+"""
+Async helpers for running agent coroutines with bounded concurrency.
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Iterable, List, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+def get_max_concurrency(default: int = DEFAULT_MAX_CONCURRENCY) -> int:
+    """
+    Get the maximum number of concurrent LLM calls per agent.
+    Can be overridden with the NYAYA_LLM_CONCURRENCY environment variable.
+
+    Args:
+        default: Value to use when the environment variable is not set
+
+    Returns:
+        Maximum concurrency (at least 1)
+    """
+    try:
+        return max(1, int(os.getenv("NYAYA_LLM_CONCURRENCY", default)))
+    except ValueError:
+        logger.warning("Invalid NYAYA_LLM_CONCURRENCY value, using default")
+        return default
+
+
+async def gather_with_concurrency(limit: int, aws: Iterable[Awaitable[T]]) -> List[T]:
+    """
+    Await coroutines concurrently with at most `limit` running at once.
+    Results are returned in the same order as the input.
+
+    Args:
+        limit: Maximum number of coroutines running at the same time
+        aws: Coroutines to await
+
+    Returns:
+        List of results
+    """
+    # Created per call so the semaphore is always bound to the running loop
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Uses asyncio.run when no event loop is running in the current thread.
+    If a loop is already running (e.g. inside a FastAPI handler), the
+    coroutine runs on a fresh loop in a worker thread instead.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        Result of the coroutine
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
@@ -0,0 +1,197 @@
+"""
+Content-addressed cache for LLM responses.
+Keeps an in-memory LRU and can optionally persist entries to SQLite
+so identical inputs skip the LLM round-trip across runs.
+"""
+
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 days
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Build a stable cache key from the given parts.
+
+    Args:
+        parts: Values identifying the request (model, prompt inputs, ...)
+
+    Returns:
+        Hex digest of the parts
+    """
+    joined = "\0".join("" if p is None else str(p) for p in parts)
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache for JSON-serializable LLM results.
+    Optionally backed by a SQLite database for reuse across processes.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1024,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            namespace: Namespace separating entries of different agents
+            maxsize: Maximum number of entries kept in memory
+            db_path: Optional SQLite file for persistent entries
+            ttl_seconds: Time-to-live for persistent entries (None = never expire)
+        """
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if db_path:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "expires_at REAL, PRIMARY KEY (namespace, key))"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent cache disabled, could not open {db_path}: {e}")
+                self._conn = None
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Copy of the cached value, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._memory[key])
+
+            value = self._get_persistent(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self._set_memory(key, value)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value in the cache.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        with self._lock:
+            self._set_memory(key, copy.deepcopy(value))
+
+            if self._conn is not None:
+                expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (namespace, key, value, expires_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at)
+                    )
+                    self._conn.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    logger.warning(f"Failed to persist cache entry: {e}")
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _set_memory(self, key: str, value: Any) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entry if full."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _get_persistent(self, key: str) -> Optional[Any]:
+        """Load a non-expired value from SQLite."""
+        if self._conn is None:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+                self._conn.commit()
+                return None
+
+            return json.loads(value)
+
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Failed to read cache entry: {e}")
+            return None
+
+
+def create_response_cache(
+    namespace: str,
+    maxsize: int = 1024,
+    version: Optional[str] = None
+) -> ResponseCache:
+    """
+    Factory function to create a ResponseCache.
+    Entries are persisted when NYAYA_CACHE_DB points to a SQLite file.
+
+    Args:
+        namespace: Namespace separating entries of different agents
+        maxsize: Maximum number of entries kept in memory
+        version: Optional fingerprint of what produced the entries (e.g. the
+            agent's prompts); persisted entries from other versions are not reused
+
+    Returns:
+        Configured ResponseCache
+    """
+    if version:
+        namespace = f"{namespace}@{make_cache_key(version)[:12]}"
+
+    return ResponseCache(
+        namespace=namespace,
+        maxsize=maxsize,
+        db_path=os.getenv("NYAYA_CACHE_DB")
+    )
@@ -0,0 +1,41 @@
+"""
+File helpers for writing pipeline artifacts safely.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+
+def write_text_atomic(path: Union[str, Path], content: str, encoding: str = "utf-8") -> None:
+    """
+    Write text to a file atomically.
+    The content goes to a temporary file in the same directory which then
+    replaces the target, so readers never see a partially written file.
+
+    Args:
+        path: Destination file path
+        content: Text to write
+        encoding: Text encoding
+    """
+    path = Path(path)
+
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
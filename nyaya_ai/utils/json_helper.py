@@ -0,0 +1,77 @@
+"""
+Fast JSON parsing helpers for LLM responses.
+Uses orjson for the common case of a clean (optionally fenced) JSON payload
+and falls back to LangChain's lenient markdown JSON parser otherwise.
+"""
+
+import logging
+from typing import Any
+
+import orjson
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.utils.json import parse_json_markdown
+
+logger = logging.getLogger(__name__)
+
+
+def strip_code_fence(text: str) -> str:
+    """
+    Remove a surrounding ```json ... ``` markdown fence, if present.
+
+    Args:
+        text: Raw LLM output
+
+    Returns:
+        Text inside the fence (or the stripped input if unfenced)
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        first_newline = text.find("\n")
+        text = text[first_newline + 1:] if first_newline != -1 else text[3:]
+        if text.endswith("```"):
+            text = text[:-3]
+    return text.strip()
+
+
+def loads_json(text: str) -> Any:
+    """
+    Parse JSON from LLM output using orjson, tolerating code fences.
+
+    Args:
+        text: Raw LLM output
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        ValueError: If the text does not contain valid JSON
+    """
+    try:
+        return orjson.loads(strip_code_fence(text))
+    except orjson.JSONDecodeError:
+        # Lenient path: JSON embedded in surrounding prose
+        return parse_json_markdown(text)
+
+
+class OrjsonOutputParser(BaseOutputParser[Any]):
+    """Drop-in replacement for JsonOutputParser backed by orjson."""
+
+    def parse(self, text: str) -> Any:
+        """
+        Parse the LLM output text as JSON.
+
+        Args:
+            text: Raw LLM output
+
+        Returns:
+            Parsed JSON value
+        """
+        try:
+            return loads_json(text)
+        except ValueError as e:
+            raise OutputParserException(f"Invalid json output: {text}") from e
+
+    @property
+    def _type(self) -> str:
+        return "orjson_output_parser"
@@ -0,0 +1,112 @@
+"""
+Shared Gemini chat clients for the NyayaAI agents.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLocalLLM(Runnable):
+    """
+    Chat model that hands each event loop its own client.
+
+    The async Gemini transport (grpc.aio) is bound to the loop it first runs
+    on, while run_sync starts a fresh loop per workflow run and the API runs
+    several of those at once on worker threads. Sharing one client across
+    loops fails with "attached to a different loop" / "Event loop is closed",
+    so async calls use a client created on (and cached for) the running loop.
+    Sync calls share one client, which is not loop-bound.
+    """
+
+    def __init__(self, factory: Callable[[], ChatGoogleGenerativeAI]):
+        """
+        Initialize the wrapper.
+
+        Args:
+            factory: Builds a new client for the wrapped configuration
+        """
+        self._factory = factory
+        self._sync_client: Optional[ChatGoogleGenerativeAI] = None
+        self._loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ChatGoogleGenerativeAI]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def client(self) -> ChatGoogleGenerativeAI:
+        """
+        Get the client for the current context.
+
+        Returns:
+            Client owned by the running event loop, or the shared sync
+            client when no loop is running
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self._lock:
+            if loop is None:
+                if self._sync_client is None:
+                    self._sync_client = self._factory()
+                return self._sync_client
+
+            client = self._loop_clients.get(loop)
+            if client is None:
+                client = self._factory()
+                self._loop_clients[loop] = client
+            return client
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.client().invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return await self.client().ainvoke(input, config, **kwargs)
+
+
+@lru_cache(maxsize=16)
+def get_llm(
+    model: str,
+    temperature: float,
+    api_key: str,
+    response_mime_type: Optional[str] = None
+) -> LoopLocalLLM:
+    """
+    Get a process-wide Gemini chat model for the given configuration.
+    Agents (and every workflow instance creating them) asking for the same
+    configuration share its clients and their underlying connections,
+    instead of each paying for its own connection setup. Each event loop
+    gets its own client (see LoopLocalLLM).
+
+    Args:
+        model: Model name
+        temperature: Sampling temperature
+        api_key: Google API key
+        response_mime_type: Optional response MIME type (e.g. "application/json")
+
+    Returns:
+        Shared chat model, usable in LCEL chains
+    """
+    kwargs = {}
+    if response_mime_type:
+        kwargs["response_mime_type"] = response_mime_type
+
+    def create_client() -> ChatGoogleGenerativeAI:
+        logger.debug(f"Creating LLM client for {model} (temperature={temperature})")
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            google_api_key=api_key,
+            **kwargs
+        )
+
+    return LoopLocalLLM(create_client)
@@ -0,0 +1,108 @@
+"""
+Helpers for locating NyayaAI annotation tags in contract markdown.
+
+Risky clauses are wrapped in -hr-/-mr-/-lr- tags, followed by an optional
+-ipc-...-ipc- citation and an optional -sg-...-sg- redline suggestion:
+
+    3. -hr-clause text-hr--ipc-citation-ipc--sg-suggestion-sg-
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Every annotation tag, matched in a single pass over the document
+TAG_PATTERN = re.compile(r'-(hr|mr|lr|ipc|sg)-')
+
+RISK_TAGS = frozenset({"hr", "mr", "lr"})
+
+_CLAUSE_PREFIX = re.compile(r'(\d+)\. ')
+
+_PREAMBLE_PREFIX = "---\n\n"
+
+
+@dataclass
+class TaggedClause:
+    """Offsets of a risk-tagged clause and its trailing annotations."""
+    clause_id: str
+    risk_tag: str
+    start: int
+    risk_end: int
+    citation_end: Optional[int] = None
+    suggestion_end: Optional[int] = None
+
+    @property
+    def end(self) -> int:
+        """Offset just after the last annotation attached to the clause."""
+        return self.suggestion_end or self.citation_end or self.risk_end
+
+
+def _clause_id_for(markdown_content: str, tag_start: int) -> Optional[str]:
+    """
+    Identify the clause whose opening risk tag starts at tag_start.
+
+    Numbered clauses start their line with "N. "; the preamble directly
+    follows the "---" header rule.
+    """
+    line_start = markdown_content.rfind("\n", 0, tag_start) + 1
+    match = _CLAUSE_PREFIX.fullmatch(markdown_content, line_start, tag_start)
+    if match:
+        return f"clause_{match.group(1)}"
+
+    if markdown_content.startswith(_PREAMBLE_PREFIX, tag_start - len(_PREAMBLE_PREFIX)):
+        return "clause_preamble"
+
+    return None
+
+
+def index_tagged_clauses(markdown_content: str) -> Dict[str, TaggedClause]:
+    """
+    Index all risk-tagged clauses with one scan over the annotation tags.
+
+    Args:
+        markdown_content: Annotated markdown content
+
+    Returns:
+        Dict mapping clause_id to TaggedClause (first occurrence wins)
+    """
+    index: Dict[str, TaggedClause] = {}
+    tags = TAG_PATTERN.finditer(markdown_content)
+    current: Optional[TaggedClause] = None
+
+    for tag in tags:
+        kind = tag.group(1)
+
+        if kind in RISK_TAGS:
+            # Opening risk tag; the clause closes at the next risk tag
+            close = next((t for t in tags if t.group(1) in RISK_TAGS), None)
+            if close is None:
+                break
+
+            current = None
+            clause_id = _clause_id_for(markdown_content, tag.start())
+            if clause_id and clause_id not in index:
+                current = TaggedClause(
+                    clause_id=clause_id,
+                    risk_tag=kind,
+                    start=tag.start(),
+                    risk_end=close.end()
+                )
+                index[clause_id] = current
+            continue
+
+        # -ipc- / -sg- block: skip to its closing tag
+        close = next((t for t in tags if t.group(1) == kind), None)
+        if close is None:
+            break
+
+        if current is None:
+            continue
+
+        if kind == "ipc" and current.citation_end is None and tag.start() == current.risk_end:
+            current.citation_end = close.end()
+        elif kind == "sg" and current.suggestion_end is None and tag.start() == current.end:
+            current.suggestion_end = close.end()
+        else:
+            current = None
+
+    return index
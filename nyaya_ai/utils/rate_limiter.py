@@ -0,0 +1,138 @@
+"""
+Token-bucket rate limiter for LLM API calls.
+Usable from both sync and async code, and safe to share across threads
+and event loops.
+"""
+
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter allowing `rate` requests per `period` seconds,
+    with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0, burst: Optional[float] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Number of requests allowed per period
+            period: Length of the period in seconds
+            burst: Maximum number of requests allowed at once (default: rate)
+        """
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate and period must be positive")
+
+        self.rate = rate
+        self.period = period
+        self.capacity = burst if burst is not None else max(1.0, rate)
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Temporary rate reduction after the API reports a rate limit
+        self._throttle_factor = 1.0
+        self._throttled_until = 0.0
+
+    def _current_rate(self, now: float) -> float:
+        """Requests per period currently allowed (reduced while throttled)."""
+        if now < self._throttled_until:
+            return self.rate * self._throttle_factor
+        return self.rate
+
+    def throttle(self, factor: float = 0.5, duration: float = 30.0) -> None:
+        """
+        Temporarily reduce the allowed rate, e.g. after a 429 response.
+        Every caller sharing this limiter slows down together instead of
+        each retrying into the exhausted quota on its own.
+
+        Args:
+            factor: Fraction of the normal rate to allow
+            duration: Seconds until the normal rate is restored
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._throttle_factor = min(factor, self._throttle_factor) if now < self._throttled_until else factor
+            self._throttled_until = max(self._throttled_until, now + duration)
+
+    def _reserve(self) -> float:
+        """
+        Take one token, returning how long the caller must wait before using it.
+
+        Returns:
+            Seconds to wait (0 if a token was available)
+        """
+        with self._lock:
+            now = time.monotonic()
+            rate = self._current_rate(now)
+            refill = (now - self._updated) * rate / self.period
+            self._tokens = min(self.capacity, self._tokens + refill)
+            self._updated = now
+
+            # Tokens may go negative: later callers queue behind earlier ones
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * self.period / rate
+
+    def acquire(self) -> None:
+        """Block until a request is allowed."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def aacquire(self) -> None:
+        """Wait asynchronously until a request is allowed."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(name: str, rate: float, period: float = 1.0) -> RateLimiter:
+    """
+    Get a process-wide rate limiter by name.
+    All agent instances using the same name share one token bucket, so
+    concurrent workflows together stay under the API quota. The limits
+    given on first use for a name are kept.
+
+    Args:
+        name: Limiter name (e.g. the API or agent it guards)
+        rate: Number of requests allowed per period
+        period: Length of the period in seconds
+
+    Returns:
+        Shared RateLimiter
+    """
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(rate=rate, period=period)
+            _shared_limiters[name] = limiter
+        return limiter
+
+
+def throttle_shared_limiters(factor: float = 0.5, duration: float = 30.0) -> None:
+    """
+    Temporarily reduce the rate of every shared limiter.
+    The agents share one API key, so a rate limit reported to any of them
+    applies to all.
+
+    Args:
+        factor: Fraction of the normal rate to allow
+        duration: Seconds until the normal rates are restored
+    """
+    with _shared_limiters_lock:
+        limiters = list(_shared_limiters.values())
+
+    for limiter in limiters:
+        limiter.throttle(factor=factor, duration=duration)
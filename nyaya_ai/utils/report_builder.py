@@ -0,0 +1,108 @@
+"""
+Risk report construction shared by the API and the CLI.
+"""
+
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+
+@lru_cache(maxsize=1024)
+def truncate_to_complete_sentence(text: str, max_length: int = 400) -> str:
+    """
+    Truncate text to a reasonable length, but only at sentence boundaries.
+    If text is longer than max_length, find the last complete sentence within that limit.
+
+    Args:
+        text: The text to truncate
+        max_length: Maximum character length before truncation
+
+    Returns:
+        Truncated text ending with a complete sentence
+    """
+    if len(text) <= max_length:
+        return text
+
+    # Find the last sentence ending within max_length
+    truncated = text[:max_length]
+
+    # Find the rightmost sentence ending: period, exclamation, question mark
+    last_sentence_end = max(truncated.rfind(mark) for mark in '.!?')
+
+    if last_sentence_end > 0:
+        # Include the punctuation mark
+        return truncated[:last_sentence_end + 1]
+    else:
+        # No sentence ending found, just truncate and add ellipsis
+        return truncated.rstrip() + "..."
+
+
+def build_risk_report(
+    final_state: Dict[str, Any],
+    analysis_timestamp: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Build the risk report for a finished workflow run.
+
+    Args:
+        final_state: Final state from workflow execution
+        analysis_timestamp: Time of the analysis (default: now)
+
+    Returns:
+        Risk report dict, ready for JSON encoding with orjson
+    """
+    risk_summary = final_state.get("contract_risk_summary")
+    risk_outputs = final_state.get("risk_outputs", [])
+    risk_counts = Counter(r.risk_level.value for r in risk_outputs)
+    # First output wins for a repeated clause_id, as in the original lookup
+    risk_score_by_id = {}
+    for r in risk_outputs:
+        risk_score_by_id.setdefault(r.clause_id, r.risk_score)
+    classified = final_state["classified_dict"]
+    risk_levels = final_state["risk_levels_dict"]
+
+    return {
+        "analysis_timestamp": analysis_timestamp or datetime.now(),
+        "pdf_path": final_state.get("pdf_path", ""),
+        "overall_risk_score": risk_summary.overall_risk_score if risk_summary else 0,
+        "risk_distribution": {
+            "high": risk_summary.risk_distribution.high,
+            "medium": risk_summary.risk_distribution.medium,
+            "low": risk_summary.risk_distribution.low,
+        } if risk_summary else {},
+        "total_clauses": len(final_state.get("clauses", [])),
+        "high_risk_clauses": risk_counts["High"],
+        "medium_risk_clauses": risk_counts["Medium"],
+        "low_risk_clauses": risk_counts["Low"],
+        "clauses": [
+            {
+                "clause_id": c.clause_id,
+                "heading": c.heading,
+                "page": c.page,
+                "type": classified.get(c.clause_id, "Unknown"),
+                "risk_level": getattr(risk_levels.get(c.clause_id), "value", "Unknown"),
+                "risk_score": risk_score_by_id.get(c.clause_id, 0)
+            }
+            for c in final_state.get("clauses", [])
+        ],
+        "citations": [
+            {
+                "clause_id": c.clause_id,
+                "found": c.found,
+                "section": c.section,
+                "law_name": c.law_name,
+                "explanation": c.explanation
+            }
+            for c in final_state.get("citations", [])
+        ],
+        "redlines": [
+            {
+                "clause_id": r.clause_id,
+                "original": truncate_to_complete_sentence(r.original_text, 300),
+                "suggested": truncate_to_complete_sentence(r.suggested_text, 400),
+                "rationale": r.rationale
+            }
+            for r in final_state.get("redlines", [])
+        ]
+    }
@@ -2,16 +2,89 @@
 Retry helper for handling API rate limits with exponential backoff.
 """
 
+import re
 import time
+import random
+import asyncio
 import logging
-from typing import Callable, TypeVar, Any
+from typing import Callable, TypeVar, Any, Optional
 from functools import wraps
 
+from utils.rate_limiter import throttle_shared_limiters
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
 
+def _is_rate_limit_error(error_msg: str) -> bool:
+    """Check if an error message indicates a rate limit error (429)."""
+    error_lower = error_msg.lower()
+    return "429" in error_msg or "quota" in error_lower or "rate limit" in error_lower
+
+
+# Server-suggested waits as rendered in Gemini error messages
+_RETRY_HINT_PATTERNS = (
+    re.compile(r'retry in (\d+(?:\.\d+)?)\s*s'),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)'),
+)
+
+
+def _get_retry_hint(error: Exception) -> Optional[float]:
+    """
+    Extract the server-suggested wait from a rate limit error.
+    
+    Args:
+        error: Exception raised by the failed attempt
+        
+    Returns:
+        Suggested wait in seconds, or None if the error carries no hint
+    """
+    # google.api_core ResourceExhausted carries a google.rpc.RetryInfo detail
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    
+    # Wrapped errors (e.g. from LangChain) only keep the message
+    error_msg = str(error).lower()
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(error_msg)
+        if match:
+            return float(match.group(1))
+    
+    return None
+
+
+def _get_wait_time(error: Exception, delay: float, max_delay: float) -> float:
+    """
+    Compute how long to wait before the next retry.
+    Uses the server's hint (capped at max_delay) when there is one,
+    otherwise full jitter over the current backoff window, so concurrent
+    callers that failed together do not all retry at the same moment.
+    
+    Args:
+        error: Exception raised by the failed attempt
+        delay: Current backoff delay in seconds
+        max_delay: Maximum delay in seconds between retries
+        
+    Returns:
+        Wait time in seconds
+    """
+    suggested_wait = _get_retry_hint(error)
+    if suggested_wait is not None:
+        return min(suggested_wait, max_delay)
+    
+    return random.uniform(0, min(delay, max_delay))
+
+
 def retry_with_exponential_backoff(
     max_retries: int = 3,
     initial_delay: float = 2.0,
@@ -20,6 +93,10 @@ def retry_with_exponential_backoff(
 ):
     """
     Decorator to retry a function with exponential backoff on rate limit errors.
+    Works with both regular functions and coroutine functions; coroutines
+    wait with asyncio.sleep so other tasks keep running during backoff.
+    Waits are jittered (or follow the server's retry hint), and every rate
+    limit error also throttles the shared rate limiters for a while.
     
     Args:
         max_retries: Maximum number of retry attempts
@@ -27,55 +104,68 @@ def retry_with_exponential_backoff(
         max_delay: Maximum delay in seconds between retries
         exponential_base: Base for exponential backoff calculation
     """
+    def should_retry(func: Callable, e: Exception, attempt: int) -> bool:
+        error_msg = str(e)
+        
+        # Not a rate limit error, raise immediately
+        if not _is_rate_limit_error(error_msg):
+            return False
+        
+        # Slow every agent down together rather than each retrying on its own
+        throttle_shared_limiters()
+        
+        if attempt >= max_retries:
+            logger.error(
+                f"Max retries ({max_retries}) reached for {func.__name__}. "
+                f"Rate limit error: {error_msg[:200]}"
+            )
+            return False
+        
+        return True
+    
+    def log_retry(func: Callable, attempt: int, wait_time: float):
+        logger.warning(
+            f"Rate limit hit in {func.__name__} (attempt {attempt + 1}/{max_retries + 1}). "
+            f"Waiting {wait_time:.1f}s before retry..."
+        )
+    
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> T:
+                delay = initial_delay
+                
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                        
+                    except Exception as e:
+                        if not should_retry(func, e, attempt):
+                            raise
+                        
+                        wait_time = _get_wait_time(e, delay, max_delay)
+                        log_retry(func, attempt, wait_time)
+                        await asyncio.sleep(wait_time)
+                        delay *= exponential_base
+            
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> T:
             delay = initial_delay
-            last_exception = None
             
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
                     
                 except Exception as e:
-                    error_msg = str(e)
-                    last_exception = e
-                    
-                    # Check if it's a rate limit error (429)
-                    if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
-                        if attempt < max_retries:
-                            # Extract wait time from error message if available
-                            wait_time = delay
-                            if "retry in" in error_msg.lower():
-                                try:
-                                    # Try to extract the suggested wait time
-                                    import re
-                                    match = re.search(r'retry in (\d+\.?\d*)', error_msg.lower())
-                                    if match:
-                                        suggested_wait = float(match.group(1))
-                                        wait_time = max(suggested_wait, delay)
-                                except:
-                                    pass
-                            
-                            wait_time = min(wait_time, max_delay)
-                            logger.warning(
-                                f"Rate limit hit in {func.__name__} (attempt {attempt + 1}/{max_retries + 1}). "
-                                f"Waiting {wait_time:.1f}s before retry..."
-                            )
-                            time.sleep(wait_time)
-                            delay *= exponential_base
-                        else:
-                            logger.error(
-                                f"Max retries ({max_retries}) reached for {func.__name__}. "
-                                f"Rate limit error: {error_msg[:200]}"
-                            )
-                            raise
-                    else:
-                        # Not a rate limit error, raise immediately
+                    if not should_retry(func, e, attempt):
                         raise
-            
-            # Should not reach here, but just in case
-            raise last_exception
+                    
+                    wait_time = _get_wait_time(e, delay, max_delay)
+                    log_retry(func, attempt, wait_time)
+                    time.sleep(wait_time)
+                    delay *= exponential_base
         
         return wrapper
     return decorator
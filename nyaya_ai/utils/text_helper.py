@@ -0,0 +1,41 @@
+"""
+Text helpers for sizing LLM prompt inputs.
+"""
+
+import re
+from functools import lru_cache
+
+# Words and individual punctuation marks, the units a subword tokenizer splits on
+_TOKEN_PIECE = re.compile(r'\w+|[^\w\s]')
+
+# Rough subword length: long words are split into several tokens
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1024)
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to an approximate token budget.
+    Tokens are estimated per word (one per CHARS_PER_TOKEN characters,
+    at least one) and per punctuation mark, and the cut always falls on a
+    word boundary. Dense text keeps fewer characters than plain prose,
+    so prompt sizes stay stable regardless of the script or wording.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Approximate maximum number of tokens to keep
+
+    Returns:
+        Text prefix within the budget (the input itself if it fits)
+    """
+    # Text this short cannot exceed the budget
+    if len(text) <= max_tokens:
+        return text
+
+    tokens = 0
+    for piece in _TOKEN_PIECE.finditer(text):
+        tokens += -(-len(piece.group()) // CHARS_PER_TOKEN)
+        if tokens > max_tokens:
+            return text[:piece.start()].rstrip()
+
+    return text
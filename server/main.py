@@ -140,6 +140,9 @@ async def generate_draft(req: GenerateDraftRequest):
 # In-memory store for voice agent document context (keyed by room name)
 voice_context_store: dict[str, dict] = {}
 
+# Upper bound on stored context; the agent trims the document to its own prompt budget
+MAX_VOICE_MARKDOWN_CHARS = 500_000
+
 class LiveKitTokenRequest(BaseModel):
     markdown: str
     risks: str
@@ -164,7 +167,7 @@ async def livekit_token(req: LiveKitTokenRequest):
 
     # Store context server-side (agent will fetch this via HTTP)
     voice_context_store[room_name] = {
-        "markdown": req.markdown[:30000],
+        "markdown": req.markdown[:MAX_VOICE_MARKDOWN_CHARS],
         "risks": req.risks[:10000],
     }
 